@@ -0,0 +1,145 @@
+"""
+Compiled kernel for calculate_confidence
+Same rules as confidence_calculator, but on plain floats/small int codes so
+numba can compile it (nopython, cached on disk). Without numba it runs as
+ordinary Python.
+"""
+
+import math
+
+# numba is optional - without it _calc runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# spx_bullish_flag
+SPX_UNKNOWN = -1
+SPX_BEARISH = 0
+SPX_BULLISH = 1
+
+# macro_regime_code
+REGIME_NONE = 0
+REGIME_BULLISH = 1
+REGIME_BEARISH = 2
+REGIME_OTHER = 3  # transition etc. - no adjustment
+
+# fg_code (Fear & Greed, row in macro_data.FG_TABLE), -1 = no data
+FG_NONE = -1
+FG_EXTREME_GREED = 0
+FG_GREED = 1
+FG_NEUTRAL = 2
+FG_FEAR = 3
+FG_EXTREME_FEAR = 4
+
+# Risk flag bits (bit i -> confidence_calculator.RISK_FACTOR_TEMPLATES)
+RISK_EXTREME_VIX = 1
+RISK_ELEVATED_VIX = 2
+RISK_BEAR_MARKET = 4
+RISK_EXTREME_BEAR = 8
+RISK_WEAK_MACRO = 16
+RISK_EXTREME_GREED = 32
+
+# Lookup tables: _bucket(x, *_THRESHOLDS) -> index into the adjustment/flag tuples.
+# "x > t" boundaries use the next float after t (same trick as macro_data.PC_THRESHOLDS)
+
+# VIX: < 15 calm +10, 15-22 neutral, > 22 elevated -5, >= 28 extreme panic -15
+_VIX_THRESHOLDS = (15.0, math.nextafter(22.0, math.inf), 28.0)
+_VIX_ADJUSTMENTS = (10.0, 0.0, -5.0, -15.0)
+_VIX_RISK_FLAGS = (0, 0, RISK_ELEVATED_VIX, RISK_EXTREME_VIX)
+
+# SPX distance from 200MA: < -5% (falling if bearish), -5..5%, > 5% (strong if bullish)
+_SPX_THRESHOLDS = (-5.0, math.nextafter(5.0, math.inf))
+_SPX_BEARISH_ADJUSTMENTS = (-12.0, -3.0, -3.0)
+_SPX_BULLISH_ADJUSTMENTS = (5.0, 5.0, 15.0)
+
+# Macro regime per code (none, bullish, bearish, other); bearish is -8 when SPX is falling
+_REGIME_ADJUSTMENTS = (0.0, 10.0, -2.0, 0.0)
+_REGIME_FALLING_ADJUSTMENTS = (0.0, 10.0, -8.0, 0.0)
+_REGIME_FALLING_RISK_FLAGS = (0, 0, RISK_EXTREME_BEAR, 0)
+
+# Macro score: < 3 very weak -5, 3-7 neutral, > 7 strong +10
+_MACRO_THRESHOLDS = (3.0, math.nextafter(7.0, math.inf))
+_MACRO_ADJUSTMENTS = (-5.0, 0.0, 10.0)
+_MACRO_RISK_FLAGS = (RISK_WEAK_MACRO, 0, 0)
+
+# Fear & Greed per fg_code: Extreme Greed -10, Extreme Fear +5 (contrarian)
+_FG_ADJUSTMENTS = (-10.0, 0.0, 0.0, 0.0, 5.0)
+_FG_RISK_FLAGS = (RISK_EXTREME_GREED, 0, 0, 0, 0)
+
+# Final confidence -> level_code (AVOID < 35 <= CAUTION < 50 <= WATCH < 65 <= BUY < 80 <= STRONG_BUY)
+_LEVEL_THRESHOLDS = (35.0, 50.0, 65.0, 80.0)
+
+
+@njit(cache=True)
+def _bucket(x, thresholds):
+    """Number of thresholds <= x (bisect_right for a short tuple)"""
+    i = 0
+    for t in thresholds:
+        if x >= t:
+            i += 1
+    return i
+
+
+@njit('Tuple((f8, f8, f8, i4, i4, i4))(f8, f8, i1, f8, i1, f8, i1)', cache=True)
+def _calc(base_score, vix, spx_bullish_flag, spx_distance,
+          macro_regime_code, macro_score, fg_code):
+    """
+    Confidence for one signal. Missing vix/macro_score are NaN.
+
+    Returns:
+        (confidence, base_confidence, adjustments, level_code, size_code, risk_flags)
+        level_code indexes LEVELS (0 = AVOID ... 4 = STRONG_BUY),
+        size_code indexes SIZES (0 = none ... 3 = full)
+    """
+    base_confidence = (base_score + 10.0) / 20.0 * 100.0
+    base_confidence = max(0.0, min(100.0, base_confidence))
+
+    # No early exit on the clamp: the tables span -50..+50, so base_confidence
+    # alone never decides the final value, and the risk flags are needed anyway
+    adjustments = 0.0
+    flags = 0
+
+    if not math.isnan(vix):
+        i = _bucket(vix, _VIX_THRESHOLDS)
+        adjustments += _VIX_ADJUSTMENTS[i]
+        flags |= _VIX_RISK_FLAGS[i]
+
+    if math.isnan(spx_distance):
+        spx_distance = 0.0
+    spx_bucket = _bucket(spx_distance, _SPX_THRESHOLDS)
+    spx_falling = spx_bullish_flag == SPX_BEARISH and spx_bucket == 0
+    if spx_bullish_flag == SPX_BEARISH:
+        adjustments += _SPX_BEARISH_ADJUSTMENTS[spx_bucket]
+        if spx_falling:
+            flags |= RISK_BEAR_MARKET
+    elif spx_bullish_flag == SPX_BULLISH:
+        adjustments += _SPX_BULLISH_ADJUSTMENTS[spx_bucket]
+
+    if spx_falling:
+        adjustments += _REGIME_FALLING_ADJUSTMENTS[macro_regime_code]
+        flags |= _REGIME_FALLING_RISK_FLAGS[macro_regime_code]
+    else:
+        adjustments += _REGIME_ADJUSTMENTS[macro_regime_code]
+
+    if not math.isnan(macro_score):
+        i = _bucket(macro_score, _MACRO_THRESHOLDS)
+        adjustments += _MACRO_ADJUSTMENTS[i]
+        flags |= _MACRO_RISK_FLAGS[i]
+
+    if fg_code >= 0:
+        adjustments += _FG_ADJUSTMENTS[fg_code]
+        flags |= _FG_RISK_FLAGS[fg_code]
+
+    final_confidence = max(0.0, min(100.0, base_confidence + adjustments))
+
+    level_code = _bucket(final_confidence, _LEVEL_THRESHOLDS)
+
+    # STRONG_BUY and BUY both get a full position
+    size_code = level_code if level_code < 4 else 3
+
+    return final_confidence, base_confidence, adjustments, level_code, size_code, flags
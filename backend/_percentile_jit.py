@@ -0,0 +1,42 @@
+"""
+Compiled kernels for PercentileSizer
+Count-based percentile ranks over a window of scores in a single pass,
+without the temporary boolean array of np.sum(window < score). Without
+numba they run as ordinary Python.
+"""
+
+import numpy as np
+
+# numba is optional - without it the kernels run as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def _count_lt(scores, x):
+    """Number of window scores strictly below x"""
+    count = 0
+    for i in range(scores.shape[0]):
+        if scores[i] < x:
+            count += 1
+    return count
+
+
+@njit(cache=True)
+def _percentile(scores, x):
+    """Percentile rank (0-100) of x in the window, same as np.sum(scores < x) / n * 100"""
+    return (_count_lt(scores, x) / scores.shape[0]) * 100
+
+
+@njit(cache=True)
+def _batch_percentile(scores, queries):
+    """Percentile rank of each query in the window"""
+    out = np.empty(queries.shape[0])
+    for j in range(queries.shape[0]):
+        out[j] = _percentile(scores, queries[j])
+    return out
@@ -4,6 +4,7 @@ Exponerar backend-funktioner for mobilappen
 """
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from stock_data import StockDataFetcher
@@ -16,17 +17,56 @@ from macro_data import MacroDataFetcher
 from signal_modes import get_available_modes, get_mode_config, validate_mode
 from alert_scheduler import get_scheduler
 import json
-import pandas as pd
+import numpy as np
 import threading
 import time
 import os
 from dotenv import load_dotenv
 
+# orjson is optional - snabbare JSON-encoding for alla jsonify-svar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Flask-Compress is optional - gzip/brotli for stora JSON-svar
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 # Load environment variables from .env file
 load_dotenv()
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider som serialiserar med orjson (Rust) istallet for stdlib json"""
+
+    OPTIONS = (
+        orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS |
+        orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Typer orjson inte kan (Decimal, date som HTTP-datum etc) gar via Flasks default
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
 
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+# Komprimera JSON-svar (historical/scan kan bli flera hundra KB)
+if Compress is not None:
+    app.config['COMPRESS_MIMETYPES'] = ['application/json']
+    app.config['COMPRESS_LEVEL'] = 6
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    Compress(app)
+
 # CORS Configuration - Allow requests from Expo web and mobile
 CORS(app, resources={
     r"/api/*": {
@@ -176,57 +216,74 @@ def get_historical_data():
     k_percent, d_percent = analyzer.calculate_stochastic(df)
     bb_upper, bb_middle, bb_lower = analyzer.calculate_bollinger_bands(df)
 
+    # Plocka ut indikatorerna som ndarrays en gang - pandas .iloc per bar ar dyrt
+    rsi_a, macd_a, sig_a, hist_a, ema_a, sma_a, k_a, d_a, bu_a, bm_a, bl_a = [
+        series.to_numpy(dtype=float) for series in (
+            rsi, macd_line, signal_line, histogram, ema_20, sma_50,
+            k_percent, d_percent, bb_upper, bb_middle, bb_lower
+        )
+    ]
+
+    # Formatera alla datum i ett svep istallet for strftime per rad
+    dates = df.index.strftime('%Y-%m-%d').to_numpy()
+    timestamps = df.index.as_unit('ms').asi8  # Epoch milliseconds
+
+    # OHLCV som ndarrays - ingen Series per rad som med iterrows()
+    opens = df['Open'].to_numpy(dtype=float)
+    highs = df['High'].to_numpy(dtype=float)
+    lows = df['Low'].to_numpy(dtype=float)
+    closes = df['Close'].to_numpy(dtype=float)
+    volumes = df['Volume'].to_numpy() if 'Volume' in df.columns else None
+
     # Convert DataFrame to JSON-friendly format
     data = []
-    for index, row in df.iterrows():
-        idx = df.index.get_loc(index)
-
+    for idx in range(len(df)):
         data_point = {
-            'timestamp': int(index.timestamp() * 1000),  # Convert to milliseconds
-            'date': index.strftime('%Y-%m-%d'),
-            'open': float(row['Open']),
-            'high': float(row['High']),
-            'low': float(row['Low']),
-            'close': float(row['Close']),
-            'volume': int(row['Volume']) if 'Volume' in row else 0,
+            'timestamp': int(timestamps[idx]),
+            'date': dates[idx],
+            'open': float(opens[idx]),
+            'high': float(highs[idx]),
+            'low': float(lows[idx]),
+            'close': float(closes[idx]),
+            'volume': int(volumes[idx]) if volumes is not None else 0,
         }
 
         # Add technical indicators (handle NaN values)
-        if not pd.isna(rsi.iloc[idx]):
-            data_point['rsi'] = float(rsi.iloc[idx])
+        if not np.isnan(rsi_a[idx]):
+            data_point['rsi'] = float(rsi_a[idx])
 
-        if not pd.isna(macd_line.iloc[idx]):
+        if not np.isnan(macd_a[idx]):
             data_point['macd'] = {
-                'macd': float(macd_line.iloc[idx]),
-                'signal': float(signal_line.iloc[idx]) if not pd.isna(signal_line.iloc[idx]) else None,
-                'histogram': float(histogram.iloc[idx]) if not pd.isna(histogram.iloc[idx]) else None,
+                'macd': float(macd_a[idx]),
+                'signal': float(sig_a[idx]) if not np.isnan(sig_a[idx]) else None,
+                'histogram': float(hist_a[idx]) if not np.isnan(hist_a[idx]) else None,
             }
 
         # Add moving averages
-        if not pd.isna(ema_20.iloc[idx]):
-            data_point['ema20'] = float(ema_20.iloc[idx])
+        if not np.isnan(ema_a[idx]):
+            data_point['ema20'] = float(ema_a[idx])
 
-        if not pd.isna(sma_50.iloc[idx]):
-            data_point['sma50'] = float(sma_50.iloc[idx])
+        if not np.isnan(sma_a[idx]):
+            data_point['sma50'] = float(sma_a[idx])
 
         # Add stochastic
-        if not pd.isna(k_percent.iloc[idx]) and not pd.isna(d_percent.iloc[idx]):
+        if not np.isnan(k_a[idx]) and not np.isnan(d_a[idx]):
             data_point['stochastic'] = {
-                'k': float(k_percent.iloc[idx]),
-                'd': float(d_percent.iloc[idx])
+                'k': float(k_a[idx]),
+                'd': float(d_a[idx])
             }
 
         # Add bollinger bands
-        if not pd.isna(bb_upper.iloc[idx]) and not pd.isna(bb_middle.iloc[idx]) and not pd.isna(bb_lower.iloc[idx]):
+        if not np.isnan(bu_a[idx]) and not np.isnan(bm_a[idx]) and not np.isnan(bl_a[idx]):
             data_point['bollinger'] = {
-                'upper': float(bb_upper.iloc[idx]),
-                'middle': float(bb_middle.iloc[idx]),
-                'lower': float(bb_lower.iloc[idx])
+                'upper': float(bu_a[idx]),
+                'middle': float(bm_a[idx]),
+                'lower': float(bl_a[idx])
             }
 
         data.append(data_point)
 
-    return jsonify({
+    response = jsonify({
         'ticker': ticker,
         'market': market,
         'period': period,
@@ -235,6 +292,10 @@ def get_historical_data():
         'count': len(data)
     })
 
+    # ETag = hash av hela svaret - oforandrad data ger 304 utan body
+    response.add_etag()
+    return response.make_conditional(request)
+
 
 @app.route('/api/stock/omx30', methods=['GET'])
 def get_omx30_list():
@@ -781,8 +842,7 @@ def send_signal_notification():
         return jsonify({'error': 'ticker, action, strength, and reason required'}), 400
 
     # Hamta push token for anvandaren
-    tokens = notification_service.get_registered_tokens()
-    push_token = tokens.get(user_id)
+    push_token = notification_service.get_push_token(user_id)
 
     if not push_token:
         return jsonify({'error': 'No push token registered for user'}), 404
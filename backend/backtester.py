@@ -3,9 +3,17 @@ Backtester
 Simulerar trading strategi historiskt med 1/3 exit logik
 """
 
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
 import numpy as np
 import pandas as pd
+import yfinance as yf
 from stock_data import StockDataFetcher
 from technical_analysis import TechnicalAnalyzer
 from signal_modes import get_mode_config
@@ -13,12 +21,251 @@ from confidence_calculator import calculate_confidence
 from macro_data import MacroDataFetcher
 from trailing_stop_manager import TrailingStopManager
 
+logger = logging.getLogger(__name__)
+
+# pyarrow is optional - without it the download cache is simply skipped
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# numba is optional - without it the scoring kernel runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Disk cache for downloaded price history (parameter sweeps re-use the same ranges)
+HISTORY_CACHE_DIR = Path(__file__).parent / 'cache' / 'history'
+HISTORY_CACHE_TTL = 24 * 3600  # Seconds; only applies to ranges ending today or later
+
+
+# Bit i in the flags returned by _score_bar -> SCORE_REASONS[i]
+SCORE_REASONS = (
+    'RSI oversold',
+    'RSI neutral',
+    'MACD bullish crossover',
+    'MACD above signal',
+    'Price above MA20',
+    'MACD positive',
+    'Positive 5-day momentum',
+)
+
+
+@njit(cache=True)
+def _score_bar(rsi, macd, macd_signal, prev_macd, prev_macd_signal, price, ma20, price_5d_ago):
+    """
+    Technical entry score for one bar (compiled with numba when available)
+
+    Returns:
+        (score, flags) where flags is a bitmask of triggered SCORE_REASONS
+    """
+    score = 0
+    flags = 0
+
+    # RSI oversold (more lenient)
+    if rsi < 45:
+        score += 2
+        flags |= 1 << 0
+    elif rsi < 50:
+        score += 1
+        flags |= 1 << 1
+
+    # MACD bullish crossover
+    if prev_macd < prev_macd_signal and macd > macd_signal:
+        score += 3
+        flags |= 1 << 2
+    elif macd > macd_signal:
+        score += 1
+        flags |= 1 << 3
+
+    # Price above 20-day MA
+    if price > ma20:
+        score += 1
+        flags |= 1 << 4
+
+    # MACD positive
+    if macd > 0:
+        score += 1
+        flags |= 1 << 5
+
+    # Positive momentum (price rising)
+    if price > price_5d_ago:
+        score += 1
+        flags |= 1 << 6
+
+    return score, flags
+
+
+@njit(cache=True)
+def _score_bars(rsi, macd, macd_signal, prev_macd, prev_macd_signal, price, ma20, price_5d_ago):
+    """_score_bar over whole indicator arrays, returns the score per bar"""
+    n = len(price)
+    scores = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        scores[i] = _score_bar(rsi[i], macd[i], macd_signal[i], prev_macd[i],
+                               prev_macd_signal[i], price[i], ma20[i], price_5d_ago[i])[0]
+    return scores
+
+
+# Exit tiers in priority order after the stop (index 0): highest target first
+EXIT_TIER_TARGETS = ('target_3', 'target_2', 'target_1')
+EXIT_TIER_REASONS = ('TARGET_3', 'TARGET_2', 'TARGET_1')
+
+
+def _score_reasons(flags, rsi):
+    """Human-readable reasons for a _score_bar bitmask (built only when needed)"""
+    reasons = []
+    for bit, reason in enumerate(SCORE_REASONS):
+        if flags & (1 << bit):
+            reasons.append(f'{reason} ({rsi:.1f})' if bit < 2 else reason)
+    return reasons
+
+
+def _fetch_cached(symbol, start, end, interval='1d'):
+    """
+    Fetch OHLCV history from yfinance, cached as parquet on disk
+
+    Args:
+        symbol: Yahoo Finance symbol (e.g. VOLV-B.ST)
+        start: Start datetime
+        end: End datetime
+        interval: Bar interval (default 1d)
+
+    Returns:
+        DataFrame with OHLCV data (may be empty)
+    """
+    start_str = start.strftime('%Y-%m-%d')
+    end_str = end.strftime('%Y-%m-%d')
+
+    def download():
+        return yf.Ticker(symbol).history(start=start_str, end=end_str, interval=interval)
+
+    if not PARQUET_AVAILABLE:
+        return download()
+
+    key = hashlib.sha1(f"{symbol}|{start_str}|{end_str}|{interval}".encode()).hexdigest()
+    path = HISTORY_CACHE_DIR / f"{key}.parquet"
+
+    # Ranges that reach today can still get new bars - expire them after TTL
+    is_open_range = end.date() >= datetime.now().date()
+    if path.exists() and not (is_open_range and time.time() - path.stat().st_mtime > HISTORY_CACHE_TTL):
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning("Failed to read history cache for %s: %s", symbol, e)
+
+    data = download()
+
+    if data is not None and not data.empty:
+        try:
+            HISTORY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Atomic write so parallel workers never read a half-written file
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            data.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Failed to write history cache for %s: %s", symbol, e)
+
+    return data
+
+
+@lru_cache(maxsize=64)
+def _fetch_yf(symbol, start_str, end_str, interval='1d'):
+    """
+    In-process memo over _fetch_cached
+
+    Parameter sweeps build many Backtesters for the same ticker and range;
+    they share one DataFrame here instead of re-reading (or re-downloading)
+    it per instance. Callers must not mutate the result - take a copy.
+    Raises LookupError when there is no data, so failed downloads are never
+    memoized and the next call retries. Clear with _fetch_yf.cache_clear().
+    """
+    data = _fetch_cached(symbol,
+                         datetime.strptime(start_str, '%Y-%m-%d'),
+                         datetime.strptime(end_str, '%Y-%m-%d'),
+                         interval=interval)
+    if data is None or data.empty:
+        raise LookupError(f"No historical data for {symbol}")
+    return data
+
+
+class TradeBuffer:
+    """
+    Struct-of-arrays storage for completed trades
+
+    Numeric columns live in preallocated NumPy arrays (doubled on overflow) so
+    metrics reduce over contiguous memory. to_dict_list() rebuilds the
+    list-of-dicts shape only for serialization.
+    """
+
+    INT_FIELDS = ('shares', 'score')
+    FLOAT_FIELDS = ('entry_price', 'exit_price', 'pnl', 'pnl_percent', 'confidence')
+    OBJECT_FIELDS = ('entry_date', 'exit_date', 'exit_reason', 'signal', 'position_size', 'risk_factors')
+
+    def __init__(self, ticker, capacity=1024):
+        self.ticker = ticker
+        self._n = 0
+        self._capacity = capacity
+        self._arrays = {name: np.empty(capacity, dtype=np.int64) for name in self.INT_FIELDS}
+        self._arrays.update({name: np.empty(capacity, dtype=np.float64) for name in self.FLOAT_FIELDS})
+        self._objects = {name: [] for name in self.OBJECT_FIELDS}
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, arr in self._arrays.items():
+            grown = np.empty(self._capacity, dtype=arr.dtype)
+            grown[:self._n] = arr[:self._n]
+            self._arrays[name] = grown
+
+    def append(self, **fields):
+        if self._n == self._capacity:
+            self._grow()
+        for name, arr in self._arrays.items():
+            arr[self._n] = fields[name]
+        for name, values in self._objects.items():
+            values.append(fields[name])
+        self._n += 1
+
+    def column(self, name):
+        """View of a numeric column over the filled rows"""
+        return self._arrays[name][:self._n]
+
+    def to_dict_list(self):
+        trades = []
+        for i in range(self._n):
+            trades.append({
+                'entry_date': self._objects['entry_date'][i],
+                'exit_date': self._objects['exit_date'][i],
+                'ticker': self.ticker,
+                'shares': int(self._arrays['shares'][i]),
+                'entry_price': float(self._arrays['entry_price'][i]),
+                'exit_price': float(self._arrays['exit_price'][i]),
+                'pnl': float(self._arrays['pnl'][i]),
+                'pnl_percent': float(self._arrays['pnl_percent'][i]),
+                'exit_reason': self._objects['exit_reason'][i],
+                'signal': self._objects['signal'][i],
+                'score': int(self._arrays['score'][i]),
+                'confidence': float(self._arrays['confidence'][i]),
+                'position_size': self._objects['position_size'][i],
+                'risk_factors': self._objects['risk_factors'][i]
+            })
+        return trades
+
 
 class Backtester:
     def __init__(self, ticker, market='SE', start_date=None, end_date=None,
                  initial_capital=100000, mode='conservative',
                  slippage=0.001, commission=0.0025, use_trailing_stop=True,
-                 disable_targets=False, targets_to_use=[1, 2, 3]):
+                 disable_targets=False, targets_to_use=[1, 2, 3], price_data=None):
         """
         Initialize backtester
 
@@ -34,6 +281,8 @@ class Backtester:
             use_trailing_stop: Enable Phase 4 ATR-based trailing stop (default True)
             disable_targets: Disable ALL 1/3 exit targets (Phase 2B Test A)
             targets_to_use: Which targets to use [1,2,3] = all, [1] = only T1, [] = none (Phase 2B Test A2)
+            price_data: Preloaded OHLCV frame (incl. indicator buffer) to use instead of
+                fetching - lets parameter sweeps load each ticker once. Not modified.
         """
         self.ticker = ticker
         self.market = market
@@ -44,6 +293,7 @@ class Backtester:
         self.use_trailing_stop = use_trailing_stop  # Phase 4 feature flag
         self.disable_targets = disable_targets  # Phase 2B Test A: Remove profit targets
         self.targets_to_use = targets_to_use  # Phase 2B Test A2: Selective targets
+        self.price_data = price_data
 
         # Setup dates
         self.end_date = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.now()
@@ -59,14 +309,20 @@ class Backtester:
         # State
         self.capital = initial_capital
         self.position = None  # Current position
-        self.trades = []  # Completed trades
-        self.equity_curve = []  # Portfolio value over time
+        self.trades = TradeBuffer(ticker)  # Completed trades
+        # Equity curve as preallocated arrays (sized in run(), filled by bar index)
+        self.equity_dates = None
+        self.equity_values = np.empty(0)
+        self.equity_capital = np.empty(0)
+        self._equity_len = 0  # Bars recorded so far
+        self._macro_context = None  # Memoized macro snapshot (fetched once per run)
+        self._confidence_by_score = {}  # base_score -> (size, confidence %, risk factors)
 
     def run(self):
         """Run backtest"""
-        print(f"\nRunning backtest for {self.ticker} ({self.market})")
-        print(f"Period: {self.start_date.strftime('%Y-%m-%d')} to {self.end_date.strftime('%Y-%m-%d')}")
-        print(f"Mode: {self.mode}, Capital: {self.initial_capital:,.0f} SEK\n")
+        logger.info("Running backtest for %s (%s)", self.ticker, self.market)
+        logger.info("Period: %s to %s", self.start_date.strftime('%Y-%m-%d'), self.end_date.strftime('%Y-%m-%d'))
+        logger.info("Mode: %s, Capital: %s SEK", self.mode, f"{self.initial_capital:,.0f}")
 
         # Fetch historical data (includes buffer for indicators)
         all_data = self._fetch_historical_data()
@@ -83,33 +339,88 @@ class Backtester:
         backtest_data = all_data[all_data.index >= start_date_aware]
 
         if backtest_data.empty:
-            print(f"No data in backtest period")
+            logger.warning("No data in backtest period for %s", self.ticker)
             return self._generate_results()
 
+        # Berakna alla indikatorer en gang over hela historiken (rolling/ewm tittar
+        # bara bakat, sa varde pa dag t ar identiskt med en berakning pa data[:t])
+        indicators = self._precompute_indicators(all_data)
+        # Plain ndarrays per indicator - positional reads without pandas indexing
+        ind_arrays = {name: indicators[name].to_numpy(dtype=float) for name in indicators.columns}
+
+        # backtest_data ar en svans av all_data - position i i backtest_data
+        # motsvarar position offset + i i all_data/indicators
+        offset = len(all_data) - len(backtest_data)
+
+        dates = backtest_data.index
+        # Plain column arrays - the loop never materializes a row Series
+        closes = backtest_data['Close'].to_numpy(dtype=float)
+        volumes = backtest_data['Volume'].to_numpy(dtype=float)
+        n = len(backtest_data)
+
+        # Bars where _check_entry can open a position (score + trend filters).
+        # Only confidence/sizing still depend on loop state, so flat stretches
+        # between candidates are skipped without calling _check_entry
+        candidate_bars = np.flatnonzero(self._entry_candidates(
+            {name: arr[offset:] for name, arr in ind_arrays.items()},
+            closes, volumes))
+
+        self.equity_dates = dates
+        self.equity_values = equity_values = np.empty(n, dtype=np.float64)
+        self.equity_capital = equity_capital = np.empty(n, dtype=np.float64)
+        self._equity_len = 0
+
+        # Bind hot methods once - the loop body then skips repeated attribute lookups
+        find_exit_bar = self._find_exit_bar
+        fill_equity = self._fill_equity
+        check_exits = self._check_exits
+        check_entry = self._check_entry
+
         # Simulate trading day by day (but pass full data for indicator calculation)
-        for idx, row in backtest_data.iterrows():
-            current_date = idx
-            current_price = row['Close']
+        i = 0
+        while i < n:
+            # With an open position, jump straight to the next bar where an exit
+            # fires - bars in between only need their equity point recorded
+            if self.position:
+                exit_i = find_exit_bar(closes, i)
+                if exit_i > i:
+                    fill_equity(i, exit_i, closes[i:exit_i])
+                    i = exit_i
+                    if i >= n:
+                        break
+            else:
+                # Flat: jump to the next bar that passes the entry filters
+                k = np.searchsorted(candidate_bars, i)
+                next_i = candidate_bars[k] if k < len(candidate_bars) else n
+                if next_i > i:
+                    fill_equity(i, next_i, closes[i:next_i])
+                    i = next_i
+                    if i >= n:
+                        break
+
+            current_date = dates[i]
+            current_price = closes[i]
 
             # Update equity curve
-            portfolio_value = self._calculate_portfolio_value(current_price)
-            self.equity_curve.append({
-                'date': current_date,
-                'value': portfolio_value,
-                'capital': self.capital
-            })
+            capital = self.capital
+            position = self.position
+            equity_values[i] = capital + position['shares'] * current_price if position else capital
+            equity_capital[i] = capital
+            self._equity_len = i + 1
 
             # Check open position for exits
-            if self.position:
-                self._check_exits(current_date, current_price, row)
+            if position:
+                check_exits(current_date, current_price)
 
-            # Generate new signal if no position (pass full data for indicators)
+            # Generate new signal if no position (precomputed indicators)
             if not self.position:
-                self._check_entry(current_date, current_price, row, all_data)
+                check_entry(current_date, current_price, volumes[i], ind_arrays, offset + i)
+
+            i += 1
 
         # Close any remaining position at end
         if self.position:
-            self._close_position(self.end_date, backtest_data.iloc[-1]['Close'], 'END_OF_BACKTEST')
+            self._close_position(self.end_date, closes[-1], 'END_OF_BACKTEST')
 
         return self._generate_results()
 
@@ -139,114 +450,155 @@ class Backtester:
 
         return atr
 
-    def _fetch_historical_data(self):
-        """Fetch historical price data using yfinance directly"""
-        try:
-            import yfinance as yf
+    def _precompute_indicators(self, all_data):
+        """
+        Calculate every indicator _check_entry needs in one vectorized pass
 
+        Args:
+            all_data: Full OHLCV history (including indicator buffer)
+
+        Returns:
+            DataFrame indexed like all_data with one column per indicator
+        """
+        close = all_data['Close']
+
+        rsi = self.analyzer.calculate_rsi(all_data, period=14)
+        macd, macd_signal, macd_hist = self.analyzer.calculate_macd(all_data)
+        adx, plus_di, minus_di = self.analyzer.calculate_adx(all_data)
+        ma20 = close.rolling(window=20).mean()
+
+        return pd.DataFrame({
+            'bars': np.arange(1, len(all_data) + 1),  # Antal bars t.o.m. denna dag
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'prev_macd': macd.shift(1),
+            'prev_macd_signal': macd_signal.shift(1),
+            'adx': adx,
+            'ma20': ma20,
+            'ma20_5d_ago': ma20.shift(5),
+            'ma50': close.rolling(window=50).mean(),
+            'ma200': close.rolling(window=200).mean(),
+            'vol_avg20': all_data['Volume'].rolling(window=20, min_periods=1).mean(),
+            'close_5d_ago': close.shift(4),  # Samma som Close.iloc[-5] pa en slice
+            'atr': self._calculate_atr(all_data),
+        }, index=all_data.index)
+
+    def _entry_candidates(self, indicators, closes, volumes):
+        """
+        Vectorized version of the score and trend filters in _check_entry
+
+        Comparisons are written as "not rejected" so NaN indicators pass the
+        same way they do in _check_entry.
+
+        Args:
+            indicators: Dict of indicator ndarrays aligned with closes
+            closes: Close prices (ndarray)
+            volumes: Volumes (ndarray)
+
+        Returns:
+            Boolean ndarray, True where an entry is possible
+        """
+        col = indicators
+
+        scores = _score_bars(
+            col['rsi'], col['macd'], col['macd_signal'], col['prev_macd'],
+            col['prev_macd_signal'], closes, col['ma20'], col['close_5d_ago']
+        )
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol_avg = col['vol_avg20']
+            volume_ratio = np.where(vol_avg > 0, volumes / vol_avg, 1.0)
+            ma20_slope = (col['ma20'] - col['ma20_5d_ago']) / col['ma20_5d_ago']
+
+            return (
+                (col['bars'] >= 50)
+                & (scores >= 1)
+                & ~(volume_ratio < 0.8)
+                & ~(col['adx'] < 15)
+                & ~(closes < col['ma50'])
+                & ~(closes < col['ma200'])
+                & ~(ma20_slope < 0)
+            )
+
+    def fetch_price_data(self):
+        """
+        Fetch historical price data using yfinance (memo/disk-cached)
+
+        Covers start_date minus a 200-day indicator buffer through end_date.
+        The frame is shared through the in-process memo - copy before
+        modifying. Pass it back as price_data= to skip the fetch in later runs.
+
+        Returns:
+            DataFrame with OHLCV data, or None if nothing could be fetched
+        """
+        try:
             # Add buffer to get enough data for technical indicators
             buffer_start = self.start_date - timedelta(days=200)
 
             # Get ticker symbol with correct suffix
             symbol = self.stock_data.get_ticker_symbol(self.ticker, self.market)
 
-            # Fetch data directly from yfinance with start/end dates
-            stock = yf.Ticker(symbol)
-            data = stock.history(
-                start=buffer_start.strftime('%Y-%m-%d'),
-                end=self.end_date.strftime('%Y-%m-%d'),
-                interval='1d'
-            )
-
-            if data is None or data.empty:
-                print(f"No historical data found for {self.ticker}")
-                return None
-
-            # Filter to actual backtest period (keep buffer for indicators)
-            # Don't filter yet - we need the buffer data for indicators
-            return data
+            # Fetch data from yfinance with start/end dates (or the memo/disk cache)
+            return _fetch_yf(symbol, buffer_start.strftime('%Y-%m-%d'),
+                             self.end_date.strftime('%Y-%m-%d'), interval='1d')
 
+        except LookupError:
+            logger.warning("No historical data found for %s", self.ticker)
+            return None
         except Exception as e:
-            print(f"Error fetching historical data: {e}")
+            logger.error("Error fetching historical data for %s: %s", self.ticker, e)
             return None
 
-    def _check_entry(self, date, price, row, historical_data):
-        """Check if we should enter a new position using historical data"""
-        try:
-            # Get data slice up to this date (for indicator calculation)
-            data_slice = historical_data.loc[:date].copy()
+    def _fetch_historical_data(self):
+        """Price data for this run - preloaded price_data or fetch_price_data()"""
+        data = self.price_data if self.price_data is not None else self.fetch_price_data()
 
-            if len(data_slice) < 50:  # Need minimum data for indicators
-                if len(self.equity_curve) == 1:  # Debug first day only
-                    print(f"Skipping {date}: Not enough data ({len(data_slice)} days)")
-                return
+        # Don't filter yet - we need the buffer data for indicators
+        # Copy so the shared/preloaded frame is never modified
+        return None if data is None else data.copy()
 
-            # Calculate technical indicators
-            rsi = self.analyzer.calculate_rsi(data_slice, period=14)
-            macd, macd_signal, macd_hist = self.analyzer.calculate_macd(data_slice)
-            adx, plus_di, minus_di = self.analyzer.calculate_adx(data_slice)
+    def _check_entry(self, date, price, volume, indicators, pos):
+        """Check if we should enter a new position using precomputed indicator arrays"""
+        try:
+            bars = indicators['bars'][pos]
+            if bars < 50:  # Need minimum data for indicators
+                if self._equity_len == 1:  # Debug first day only
+                    logger.debug("Skipping %s: Not enough data (%d days)", date, int(bars))
+                return
 
-            # Get latest values
-            current_rsi = rsi.iloc[-1]
-            current_macd = macd.iloc[-1]
-            current_macd_signal = macd_signal.iloc[-1]
-            prev_macd = macd.iloc[-2] if len(macd) > 1 else None
-            prev_macd_signal = macd_signal.iloc[-2] if len(macd_signal) > 1 else None
-            current_adx = adx.iloc[-1] if not pd.isna(adx.iloc[-1]) else None
+            # Get latest values (positional reads from ndarrays)
+            current_rsi = indicators['rsi'][pos]
+            current_macd = indicators['macd'][pos]
+            current_macd_signal = indicators['macd_signal'][pos]
+            prev_macd = indicators['prev_macd'][pos]
+            prev_macd_signal = indicators['prev_macd_signal'][pos]
+            adx = indicators['adx'][pos]
+            current_adx = adx if not np.isnan(adx) else None
 
-            # Calculate 20-day MA
-            ma20 = data_slice['Close'].rolling(window=20).mean().iloc[-1]
+            # 20-day MA
+            ma20 = indicators['ma20'][pos]
 
             # Calculate volume ratio
-            volume_avg_20 = data_slice['Volume'].tail(20).mean()
-            volume_ratio = row['Volume'] / volume_avg_20 if volume_avg_20 > 0 else 1.0
+            volume_avg_20 = indicators['vol_avg20'][pos]
+            volume_ratio = volume / volume_avg_20 if volume_avg_20 > 0 else 1.0
 
             # Debug: Print indicator values for first few days (optional - comment out for production)
-            # if len(self.equity_curve) < 5:
-            #     print(f"\n[{date.strftime('%Y-%m-%d')}] Indicator Values:")
-            #     print(f"  Price: {price:.2f}, RSI: {current_rsi:.2f}, MACD: {current_macd:.4f}, MA20: {ma20:.2f}")
+            # if self._equity_len < 5:
+            #     logger.debug("[%s] Indicator Values:", date.strftime('%Y-%m-%d'))
+            #     logger.debug("  Price: %.2f, RSI: %.2f, MACD: %.4f, MA20: %.2f", price, current_rsi, current_macd, ma20)
 
             # Generate simple buy signal based on technical rules
-            score = 0
-            reasons = []
-
-            # RSI oversold (more lenient)
-            if current_rsi < 45:
-                score += 2
-                reasons.append(f'RSI oversold ({current_rsi:.1f})')
-            elif current_rsi < 50:
-                score += 1
-                reasons.append(f'RSI neutral ({current_rsi:.1f})')
-
-            # MACD bullish crossover
-            if prev_macd is not None and prev_macd_signal is not None:
-                if prev_macd < prev_macd_signal and current_macd > current_macd_signal:
-                    score += 3
-                    reasons.append('MACD bullish crossover')
-                elif current_macd > current_macd_signal:
-                    score += 1
-                    reasons.append('MACD above signal')
-
-            # Price above 20-day MA
-            if price > ma20:
-                score += 1
-                reasons.append('Price above MA20')
-
-            # MACD positive
-            if current_macd > 0:
-                score += 1
-                reasons.append('MACD positive')
-
-            # Positive momentum (price rising)
-            if len(data_slice) >= 5:
-                price_5d_ago = data_slice['Close'].iloc[-5]
-                if price > price_5d_ago:
-                    score += 1
-                    reasons.append('Positive 5-day momentum')
+            price_5d_ago = indicators['close_5d_ago'][pos]
+            score, score_flags = _score_bar(
+                current_rsi, current_macd, current_macd_signal,
+                prev_macd, prev_macd_signal, price, ma20, price_5d_ago
+            )
 
             # Debug: Print signal scoring (optional - comment out for production)
-            # if len(self.equity_curve) < 10:
-            #     print(f"  Final Score: {score}, Reasons: {reasons if reasons else 'None'}")
+            # if self._equity_len < 10:
+            #     logger.debug("  Final Score: %s, Reasons: %s", score, _score_reasons(score_flags, current_rsi) or 'None')
 
             # Check if signal meets threshold (lowered for backtesting to show trades)
             if score < 1:  # Minimum score to enter (very permissive for demo)
@@ -261,19 +613,19 @@ class Backtester:
             if current_adx is not None and current_adx < 15:  # Too choppy
                 return
 
-            # Calculate 50MA and 200MA for trend filter
-            ma50 = data_slice['Close'].rolling(window=50).mean().iloc[-1] if len(data_slice) >= 50 else None
-            ma200 = data_slice['Close'].rolling(window=200).mean().iloc[-1] if len(data_slice) >= 200 else None
+            # 50MA and 200MA for trend filter (NaN until enough history)
+            ma50 = indicators['ma50'][pos]
+            ma200 = indicators['ma200'][pos]
 
             # Price must be above 50MA AND 200MA (bullish trend)
-            if ma50 is not None and price < ma50:
+            if not np.isnan(ma50) and price < ma50:
                 return
-            if ma200 is not None and price < ma200:
+            if not np.isnan(ma200) and price < ma200:
                 return
 
             # 20MA slope must be positive (short-term trend up)
-            if len(data_slice) >= 25:
-                ma20_5d_ago = data_slice['Close'].rolling(window=20).mean().iloc[-6]
+            ma20_5d_ago = indicators['ma20_5d_ago'][pos]
+            if not np.isnan(ma20_5d_ago):
                 ma20_slope = (ma20 - ma20_5d_ago) / ma20_5d_ago
                 if ma20_slope < 0:  # Negative slope = downtrend
                     return
@@ -283,35 +635,21 @@ class Backtester:
             # Our score ranges from 0 to ~10, so normalize it
             base_score = (score - 5) * 2  # Convert to -10 to +10 range (approximate)
 
-            # Fetch current macro conditions
+            # Confidence under current macro conditions (table lookup per score)
             try:
-                macro_context = self.macro_data.get_all_macro_data()
-                vix_data = macro_context.get('vix')
-                spx_trend = macro_context.get('spx_trend')
-                vix_value = vix_data.get('value') if vix_data else None
-
-                # Calculate confidence
-                confidence_result = calculate_confidence(
-                    base_score=base_score,
-                    vix_value=vix_value,
-                    spx_trend=spx_trend,
-                    macro_regime=macro_context.get('regime'),
-                    macro_score=macro_context.get('macro_score'),
-                    sentiment_data=macro_context.get('sentiment')
-                )
-
-                recommended_size = confidence_result['recommended_size']
-                confidence_pct = confidence_result['confidence']
-                risk_factors = confidence_result['risk_factors']
+                recommended_size, confidence_pct, risk_factors = self._get_confidence(base_score)
+                risk_factors = list(risk_factors)
 
                 # Skip trade if confidence is too low (AVOID level)
                 if recommended_size == 'none':
-                    print(f"[{date.strftime('%Y-%m-%d')}] SKIPPED: Confidence too low ({confidence_pct:.1f}%), Risk: {', '.join(risk_factors)}")
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("[%s] SKIPPED: Confidence too low (%.1f%%), Risk: %s",
+                                    date.strftime('%Y-%m-%d'), confidence_pct, ', '.join(risk_factors))
                     return
 
             except Exception as e:
                 # If macro data fails, default to full size (fallback)
-                print(f"Warning: Could not calculate confidence, using full position: {e}")
+                logger.warning("Could not calculate confidence, using full position: %s", e)
                 recommended_size = 'full'
                 confidence_pct = 70.0
                 risk_factors = []
@@ -340,9 +678,9 @@ class Backtester:
             if cost > self.capital:
                 return  # Not enough capital after commission
 
-            # Calculate ATR for trailing stop (Phase 4)
-            atr_series = self._calculate_atr(data_slice)
-            current_atr = atr_series.iloc[-1] if not pd.isna(atr_series.iloc[-1]) else (price * 0.02)  # Fallback to 2% if ATR fails
+            # ATR for trailing stop (Phase 4)
+            atr = indicators['atr'][pos]
+            current_atr = atr if not np.isnan(atr) else (price * 0.02)  # Fallback to 2% if ATR fails
 
             # Calculate stop loss and targets based on mode config
             stop_pct = self.mode_config['stop_loss_buffer'] * 100  # Convert to percentage
@@ -393,69 +731,181 @@ class Backtester:
 
             self.capital -= cost
 
-            # Build risk warning message
-            risk_msg = f" [⚠️ {', '.join(risk_factors[:2])}]" if risk_factors else ""
-            size_msg = f" [{recommended_size.upper()}]" if recommended_size != 'full' else ""
+            # Build risk warning message (only when it will actually be logged)
+            if logger.isEnabledFor(logging.INFO):
+                risk_msg = f" [⚠️ {', '.join(risk_factors[:2])}]" if risk_factors else ""
+                size_msg = f" [{recommended_size.upper()}]" if recommended_size != 'full' else ""
 
-            print(f"[{date.strftime('%Y-%m-%d')}] ENTRY: {shares} shares @ {entry_price:.2f} SEK (Score: {score}, Confidence: {confidence_pct:.1f}%{size_msg}{risk_msg})")
+                logger.info("[%s] ENTRY: %d shares @ %.2f SEK (Score: %s, Confidence: %.1f%%%s%s)",
+                            date.strftime('%Y-%m-%d'), shares, entry_price, score, confidence_pct,
+                            size_msg, risk_msg)
 
         except Exception as e:
-            print(f"Error checking entry: {e}")
+            logger.error("Error checking entry: %s", e)
+
+    def _get_macro_context(self):
+        """
+        Macro snapshot used for confidence scoring, fetched once per backtest
+
+        MacroDataFetcher only returns current conditions (no history), so the
+        value is the same for every bar - fetching it per entry candidate only
+        repeated network/cache work. Failed fetches are not memoized.
+        """
+        if self._macro_context is None:
+            self._macro_context = self.macro_data.get_all_macro_data()
+        return self._macro_context
+
+    def _get_confidence(self, base_score):
+        """
+        calculate_confidence for this run's macro snapshot, memoized per base score
+
+        The macro inputs are fixed for the whole run, so confidence only varies
+        with the handful of distinct base scores. Failures are not memoized.
+
+        Returns:
+            (recommended_size, confidence_pct, risk_factors tuple)
+        """
+        cached = self._confidence_by_score.get(base_score)
+        if cached is None:
+            macro_context = self._get_macro_context()
+            vix_data = macro_context.get('vix')
+            vix_value = vix_data.get('value') if vix_data else None
+
+            confidence_result = calculate_confidence(
+                base_score=base_score,
+                vix_value=vix_value,
+                spx_trend=macro_context.get('spx_trend'),
+                macro_regime=macro_context.get('regime'),
+                macro_score=macro_context.get('macro_score'),
+                sentiment_data=macro_context.get('sentiment')
+            )
+
+            cached = (
+                confidence_result['recommended_size'],
+                confidence_result['confidence'],
+                tuple(confidence_result['risk_factors'])
+            )
+            self._confidence_by_score[base_score] = cached
+
+        return cached
+
+    def _find_exit_bar(self, closes, start):
+        """
+        Vectorized scan for the first bar >= start where _check_exits would fire
+
+        Between exits the only state that changes is the Chandelier trailing
+        stop, which is a running max: stop_t = max(stop_0, highest_t - k*ATR).
+        Targets and share counts are fixed until the next exit, so every exit
+        condition can be evaluated over the whole forward window at once.
+
+        Args:
+            closes: Close prices of the backtest period (ndarray)
+            start: Index of the first bar to scan
+
+        Returns:
+            Index of the first exit bar, or len(closes) if none fires. The
+            position's highest_price/stop_loss are advanced to the bar before it.
+        """
+        position = self.position
+        window = closes[start:]
+
+        if self.use_trailing_stop:
+            highest = np.maximum.accumulate(np.maximum(window, position['highest_price']))
+            stops = np.maximum(
+                highest - (position['atr'] * self.trailing_manager.atr_multiplier),
+                position['stop_loss']
+            )
+        else:
+            stops = position['stop_loss']
+
+        hits = window <= stops
 
-    def _check_exits(self, date, price, row):
+        # Any enabled target fires once price reaches the lowest of them
+        tier_mask = self._exit_tier_mask(position)
+        if tier_mask.any():
+            levels = np.array([position[key] for key in EXIT_TIER_TARGETS])
+            hits |= window >= levels[tier_mask].min()
+
+        offset = int(np.argmax(hits)) if hits.any() else len(window)
+
+        if self.use_trailing_stop and offset > 0:
+            position['highest_price'] = highest[offset - 1]
+            position['stop_loss'] = stops[offset - 1]
+
+        return start + offset
+
+    def _fill_equity(self, start, stop, closes):
+        """Record equity for bars start..stop-1 where the position is unchanged"""
+        shares = self.position['shares'] if self.position else 0
+        capital = self.capital
+
+        self.equity_values[start:stop] = capital + shares * closes
+        self.equity_capital[start:stop] = capital
+        self._equity_len = stop
+
+    def _check_exits(self, date, price):
         """Check if any exit conditions are met (Phase 1: Chandelier Exit trailing stop)"""
-        if not self.position:
+        position = self.position
+        if not position:
             return
 
         # Phase 1: Update trailing stop using Chandelier Exit
         if self.use_trailing_stop:
             # Track highest price for Chandelier calculation
-            if price > self.position['highest_price']:
-                self.position['highest_price'] = price
-
-            # Get current ATR (using stored ATR from entry)
-            current_atr = self.position['atr']
+            if price > position['highest_price']:
+                position['highest_price'] = price
 
-            # Update stop using Chandelier Exit manager
-            self.position = self.trailing_manager.update_stop(
-                position=self.position,
+            # Update stop using Chandelier Exit manager (ATR stored at entry)
+            position = self.position = self.trailing_manager.update_stop(
+                position=position,
                 current_price=price,
-                current_atr=current_atr
+                current_atr=position['atr']
             )
 
-        shares_to_sell = 0
-        exit_reason = None
-        exit_price = price
+        # Stop + T3/T2/T1 checked as one masked comparison; the first hit
+        # in priority order (argmax) decides the exit
+        hits = np.empty(4, dtype=bool)
+        hits[0] = price <= position['stop_loss']
+        hits[1:] = (price >= np.array([position[key] for key in EXIT_TIER_TARGETS])) \
+            & self._exit_tier_mask(position)
 
-        # Check stop loss (sells all remaining shares)
-        if price <= self.position['stop_loss']:
-            shares_to_sell = self.position['shares']
+        if not hits.any():
+            return
+
+        tier = int(hits.argmax())
+        if tier == 0:
+            # Stop loss sells all remaining shares
             exit_reason = 'CHANDELIER_STOP' if self.use_trailing_stop else 'STOP_LOSS'
-            exit_price = price * (1 - self.slippage)  # Worse price on stop loss
-
-        # Phase 2B Test A/A2: Optional 1/3 exit targets (can be disabled or selective)
-        elif not self.disable_targets:
-            # Check Target 3 (sell final 1/3) - only if 3 in targets_to_use
-            if 3 in self.targets_to_use and price >= self.position['target_3'] and self.position['shares'] > 0:
-                shares_to_sell = self.position['shares']  # Sell all remaining
-                exit_reason = 'TARGET_3'
-                exit_price = price * (1 - self.slippage)
-
-            # Check Target 2 (sell 1/3) - only if 2 in targets_to_use
-            elif 2 in self.targets_to_use and price >= self.position['target_2'] and self.position['shares'] >= (self.position['initial_shares'] * 2 / 3):
-                shares_to_sell = int(self.position['initial_shares'] / 3)
-                exit_reason = 'TARGET_2'
-                exit_price = price * (1 - self.slippage)
-
-            # Check Target 1 (sell 1/3) - only if 1 in targets_to_use
-            elif 1 in self.targets_to_use and price >= self.position['target_1'] and self.position['shares'] == self.position['initial_shares']:
-                shares_to_sell = int(self.position['initial_shares'] / 3)
-                exit_reason = 'TARGET_1'
-                exit_price = price * (1 - self.slippage)
+            shares_to_sell = position['shares']
+        else:
+            # Target 3 sells the rest, Target 1/2 sell 1/3 of the initial position each
+            exit_reason = EXIT_TIER_REASONS[tier - 1]
+            shares_to_sell = position['shares'] if tier == 1 else int(position['initial_shares'] / 3)
 
         if shares_to_sell > 0:
+            exit_price = price * (1 - self.slippage)  # Worse price on exit
             self._execute_exit(date, exit_price, shares_to_sell, exit_reason)
 
+    def _exit_tier_mask(self, position):
+        """
+        Which targets (T3, T2, T1) may still fire for this position
+
+        Phase 2B Test A/A2: targets can be disabled or selective. T2 needs at
+        least 2/3 of the shares left, T1 needs the full position.
+        """
+        if self.disable_targets:
+            return np.zeros(3, dtype=bool)
+
+        targets_to_use = self.targets_to_use
+        shares = position['shares']
+        initial_shares = position['initial_shares']
+
+        return np.array([
+            3 in targets_to_use and shares > 0,
+            2 in targets_to_use and shares >= (initial_shares * 2 / 3),
+            1 in targets_to_use and shares == initial_shares,
+        ])
+
     def _execute_exit(self, date, price, shares, reason):
         """Execute a partial or full exit"""
         proceeds = shares * price * (1 - self.commission)  # Subtract commission
@@ -467,28 +917,28 @@ class Backtester:
         pnl_percent = (pnl / cost_basis) * 100
 
         # Record trade
-        trade = {
-            'entry_date': self.position['entry_date'],
-            'exit_date': date,
-            'ticker': self.ticker,
-            'shares': shares,
-            'entry_price': self.position['entry_price'],
-            'exit_price': price,
-            'pnl': pnl,
-            'pnl_percent': pnl_percent,
-            'exit_reason': reason,
-            'signal': self.position['signal'],
-            'score': self.position['score'],
-            'confidence': self.position.get('confidence', 0),
-            'position_size': self.position.get('position_size', 'full'),
-            'risk_factors': self.position.get('risk_factors', [])
-        }
-        self.trades.append(trade)
+        self.trades.append(
+            entry_date=self.position['entry_date'],
+            exit_date=date,
+            shares=shares,
+            entry_price=self.position['entry_price'],
+            exit_price=price,
+            pnl=pnl,
+            pnl_percent=pnl_percent,
+            exit_reason=reason,
+            signal=self.position['signal'],
+            score=self.position['score'],
+            confidence=self.position.get('confidence', 0),
+            position_size=self.position.get('position_size', 'full'),
+            risk_factors=self.position.get('risk_factors', [])
+        )
 
         # Update position
         self.position['shares'] -= shares
 
-        print(f"[{date.strftime('%Y-%m-%d')}] EXIT ({reason}): {shares} shares @ {price:.2f} SEK, P/L: {pnl:+.2f} SEK ({pnl_percent:+.1f}%)")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] EXIT (%s): %d shares @ %.2f SEK, P/L: %+.2f SEK (%+.1f%%)",
+                        date.strftime('%Y-%m-%d'), reason, shares, price, pnl, pnl_percent)
 
         # Close position if all shares sold
         if self.position['shares'] == 0:
@@ -508,7 +958,7 @@ class Backtester:
 
     def _generate_results(self):
         """Generate backtest results with metrics"""
-        if not self.trades and not self.equity_curve:
+        if not self.trades and self._equity_len == 0:
             return {
                 'error': 'No trades executed during backtest period',
                 'metrics': {},
@@ -519,7 +969,7 @@ class Backtester:
         # Calculate metrics
         final_value = self.capital
         if self.position:
-            final_value += self.position['shares'] * self.equity_curve[-1]['value']
+            final_value += self.position['shares'] * self.equity_values[self._equity_len - 1]
 
         total_return = ((final_value - self.initial_capital) / self.initial_capital) * 100
 
@@ -529,13 +979,16 @@ class Backtester:
         cagr = (((final_value / self.initial_capital) ** (1 / years)) - 1) * 100 if years > 0 else 0
 
         # Calculate win rate
-        winning_trades = [t for t in self.trades if t['pnl'] > 0]
-        losing_trades = [t for t in self.trades if t['pnl'] <= 0]
-        win_rate = (len(winning_trades) / len(self.trades) * 100) if self.trades else 0
+        pnl = self.trades.column('pnl')
+        pnl_percent = self.trades.column('pnl_percent')
+        winning = pnl > 0
+        num_winning = int(winning.sum())
+        num_losing = len(self.trades) - num_winning
+        win_rate = (num_winning / len(self.trades) * 100) if self.trades else 0
 
         # Calculate average gain/loss
-        avg_gain = np.mean([t['pnl_percent'] for t in winning_trades]) if winning_trades else 0
-        avg_loss = np.mean([t['pnl_percent'] for t in losing_trades]) if losing_trades else 0
+        avg_gain = pnl_percent[winning].mean() if num_winning else 0
+        avg_loss = pnl_percent[~winning].mean() if num_losing else 0
 
         # Calculate max drawdown
         max_drawdown = self._calculate_max_drawdown()
@@ -549,21 +1002,21 @@ class Backtester:
             'total_return': total_return,
             'cagr': cagr,
             'total_trades': len(self.trades),
-            'winning_trades': len(winning_trades),
-            'losing_trades': len(losing_trades),
+            'winning_trades': num_winning,
+            'losing_trades': num_losing,
             'win_rate': win_rate,
             'avg_gain': avg_gain,
             'avg_loss': avg_loss,
             'max_drawdown': max_drawdown,
             'sharpe_ratio': sharpe_ratio,
             'profit_factor': abs(avg_gain / avg_loss) if avg_loss != 0 else 0,
-            'total_pnl': sum([t['pnl'] for t in self.trades])
+            'total_pnl': float(pnl.sum())
         }
 
         return {
             'metrics': metrics,
-            'trades': self.trades,
-            'equity_curve': self.equity_curve,
+            'trades': self.trades.to_dict_list(),
+            'equity_curve': self._equity_curve_dicts(),
             'config': {
                 'ticker': self.ticker,
                 'market': self.market,
@@ -573,36 +1026,40 @@ class Backtester:
             }
         }
 
+    def _equity_curve_dicts(self):
+        """Equity curve as list of {date, value, capital} dicts (for serialization only)"""
+        n = self._equity_len
+        return [
+            {'date': date, 'value': value, 'capital': capital}
+            for date, value, capital in zip(self.equity_dates[:n],
+                                            self.equity_values[:n].tolist(),
+                                            self.equity_capital[:n].tolist())
+        ]
+
     def _calculate_max_drawdown(self):
         """Calculate maximum drawdown from equity curve"""
-        if not self.equity_curve:
+        if self._equity_len == 0:
             return 0
 
-        values = [point['value'] for point in self.equity_curve]
-        peak = values[0]
-        max_dd = 0
+        values = self.equity_values[:self._equity_len]
+        peak = np.maximum.accumulate(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dd = np.where(peak > 0, (peak - values) / peak, 0.0)
 
-        for value in values:
-            if value > peak:
-                peak = value
-            dd = ((peak - value) / peak) * 100
-            if dd > max_dd:
-                max_dd = dd
-
-        return max_dd
+        return float(100.0 * dd.max())
 
     def _calculate_sharpe_ratio(self):
         """Calculate Sharpe ratio (simplified)"""
         if not self.trades:
             return 0
 
-        returns = [t['pnl_percent'] for t in self.trades]
+        returns = self.trades.column('pnl_percent')
 
         if len(returns) < 2:
             return 0
 
-        mean_return = np.mean(returns)
-        std_return = np.std(returns)
+        mean_return = returns.mean()
+        std_return = returns.std()
 
         if std_return == 0:
             return 0
@@ -611,3 +1068,34 @@ class Backtester:
         sharpe = (mean_return / std_return) * np.sqrt(252 / len(self.trades))
 
         return sharpe
+
+
+def run_for_ticker(kwargs):
+    """Run a single backtest from Backtester kwargs (module-level so it pickles)"""
+    return Backtester(**kwargs).run()
+
+
+def run_many(configs, max_workers=None):
+    """
+    Run independent backtests in parallel, one process per worker
+
+    Args:
+        configs: List of Backtester kwargs dicts (ticker, mode, dates, ...).
+            Pass price_data (see Backtester.fetch_price_data) to keep workers
+            from downloading - each process has its own rate limiter.
+        max_workers: Number of processes (default: os.cpu_count())
+
+    Yields:
+        (config, result, error) tuples as each backtest completes. A failing
+        backtest yields (config, None, exception) instead of aborting the run.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {executor.submit(run_for_ticker, config): config for config in configs}
+
+        for future in as_completed(futures):
+            config = futures[future]
+            try:
+                yield config, future.result(), None
+            except Exception as e:
+                logger.error("Backtest failed for %s: %s", config.get('ticker'), e)
+                yield config, None, e
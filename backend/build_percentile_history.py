@@ -4,11 +4,77 @@ Scans market backwards to build 30+ days of percentile history for backtesting
 """
 
 from datetime import datetime, timedelta
-from market_scanner import MarketScanner
+from typing import Dict, List
+import pandas as pd
+import yfinance as yf
+from market_scanner import MarketScanner, OMX30_TICKERS, SCAN_LOOKBACK_BARS
 from percentile_sizer import PercentileSizer
+from stock_data import StockDataFetcher, YAHOO_RATE_LIMITER
 import json
 import time
 
+# Retries for the batch download, with exponential backoff (2s, 4s, 8s...)
+PREFETCH_RETRIES = 4
+PREFETCH_BACKOFF = 2.0
+
+
+def prefetch_history(tickers: List[str], start_date: datetime, end_date: datetime,
+                     market: str = 'SE') -> Dict[str, pd.DataFrame]:
+    """
+    Download OHLCV for all tickers over the whole period in one batch request
+
+    Args:
+        tickers: Tickers to fetch
+        start_date: First scan date (a lookback buffer is added before it)
+        end_date: Last scan date
+        market: Market (default: SE)
+
+    Returns:
+        Dict of ticker -> OHLCV DataFrame (tickers without data are left out)
+    """
+    fetcher = StockDataFetcher()
+    symbols = {fetcher.get_ticker_symbol(t, market): t for t in tickers}
+
+    # ~2 calendar days per trading bar is enough buffer for the lookback window
+    buffer_start = start_date - timedelta(days=SCAN_LOOKBACK_BARS * 2)
+
+    raw = None
+    for attempt in range(PREFETCH_RETRIES):
+        YAHOO_RATE_LIMITER.acquire()
+        try:
+            raw = yf.download(
+                list(symbols),
+                start=buffer_start.strftime('%Y-%m-%d'),
+                end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False
+            )
+        except Exception as e:
+            print(f"  Download failed: {e}")
+            raw = None
+
+        if raw is not None and not raw.empty:
+            break
+
+        # Back off only when Yahoo actually fails/throttles us
+        if attempt < PREFETCH_RETRIES - 1:
+            wait = PREFETCH_BACKOFF * (2 ** attempt)
+            print(f"  No data returned, retrying in {wait:.0f}s...")
+            time.sleep(wait)
+
+    price_data = {}
+    for symbol, ticker in symbols.items():
+        if raw is None or symbol not in raw.columns.get_level_values(0):
+            print(f"  No data for {ticker} ({symbol})")
+            continue
+        frame = raw[symbol].dropna(how='all')
+        if not frame.empty:
+            price_data[ticker] = frame
+
+    return price_data
+
 
 def build_history(start_date: datetime, end_date: datetime, output_file: str = 'percentile_history.json'):
     """
@@ -26,6 +92,11 @@ def build_history(start_date: datetime, end_date: datetime, output_file: str = '
     # Clear existing history
     sizer.score_history = {}
 
+    # Fetch all prices up front - the day loop below then runs without network calls
+    print(f"Fetching price history for {len(OMX30_TICKERS)} tickers...")
+    price_data = prefetch_history(OMX30_TICKERS, start_date, end_date, market='SE')
+    print(f"Fetched {len(price_data)} tickers\n")
+
     current_date = start_date
     trading_days = 0
     failed_days = 0
@@ -43,7 +114,7 @@ def build_history(start_date: datetime, end_date: datetime, output_file: str = '
 
         try:
             # Scan market for this date
-            results = scanner.scan_market(date=current_date, market='SE')
+            results = scanner.scan_market(date=current_date, market='SE', price_data=price_data)
 
             if results and len(results) > 0:
                 # Add to percentile history
@@ -56,8 +127,6 @@ def build_history(start_date: datetime, end_date: datetime, output_file: str = '
                     mean_score = sum(scores) / len(scores)
                     print(f"[{current_date.strftime('%Y-%m-%d')}] Day {trading_days}: "
                           f"Scanned {len(results)} stocks, mean score: {mean_score:.2f}")
-                    # Extra cooldown every 5 days
-                    time.sleep(2.0)
             else:
                 failed_days += 1
                 print(f"[{current_date.strftime('%Y-%m-%d')}] No data (likely holiday/weekend)")
@@ -104,7 +173,7 @@ if __name__ == "__main__":
 
     print("\nBuilding percentile history for 2024 backtest...")
     print(f"This will scan {(end - start).days} days (~250 trading days)")
-    print("This may take 10-15 minutes...\n")
+    print("Prices are fetched once up front, then each day is scored locally\n")
 
     sizer = build_history(start, end)
 
@@ -0,0 +1,61 @@
+"""
+Cache Utilities
+Delad TTL-cache for metoder (makrodata, nyheter, scanner)
+"""
+
+import copy
+import functools
+import threading
+import time
+
+
+def ttl_cache(seconds: float, maxsize: int = 256):
+    """
+    Cachar en metods returvarde i `seconds` sekunder
+
+    Nyckeln ar argumenten (self ingar inte), sa cachen delas mellan alla
+    instanser av klassen. None-resultat (fel) cachas inte. Utgangna nycklar
+    rensas vid varje skrivning och som mest `maxsize` nycklar sparas (aldst
+    skrivna slangs forst). Varje anrop far en egen kopia av vardet, sa
+    anroparen kan andra i resultatet utan att paverka cachen.
+    Rensa med wrapper.cache_clear().
+    """
+    def decorator(func):
+        cache = {}  # key -> (value, expires_at), i skrivordning
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.time()
+
+            with lock:
+                entry = cache.get(key)
+            if entry is not None and now < entry[1]:
+                return copy.deepcopy(entry[0])
+
+            value = func(self, *args, **kwargs)
+            if value is not None:
+                with lock:
+                    _evict(cache, now, maxsize)
+                    cache.pop(key, None)  # Flytta nyckeln sist i skrivordningen
+                    cache[key] = (value, now + seconds)
+                value = copy.deepcopy(value)
+            return value
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+def _evict(cache: dict, now: float, maxsize: int):
+    """Ta bort utgangna nycklar, sedan de aldsta tills det finns plats for en till"""
+    for key in [key for key, (_, expires_at) in cache.items() if expires_at <= now]:
+        del cache[key]
+
+    while len(cache) >= maxsize:
+        del cache[next(iter(cache))]
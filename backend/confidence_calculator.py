@@ -3,8 +3,68 @@ MarketMate Confidence Calculator
 Converts signal scores to confidence levels (0-100%) with risk adjustments
 """
 
+import math
 from typing import Dict, Optional, List
 
+import numpy as np
+
+import _confidence_numba as kernel
+from _confidence_numba import (
+    _calc, SPX_UNKNOWN, SPX_BEARISH, SPX_BULLISH,
+    REGIME_NONE, REGIME_BULLISH, REGIME_BEARISH, REGIME_OTHER,
+    FG_NONE, FG_EXTREME_GREED, FG_GREED, FG_NEUTRAL, FG_FEAR, FG_EXTREME_FEAR,
+    RISK_EXTREME_VIX, RISK_ELEVATED_VIX, RISK_BEAR_MARKET, RISK_EXTREME_BEAR,
+    RISK_WEAK_MACRO, RISK_EXTREME_GREED,
+)
+
+
+# Names per kernel level_code (0 AVOID ... 4 STRONG_BUY) and size_code (0 none ... 3 full)
+LEVELS = ('AVOID', 'CAUTION', 'WATCH', 'BUY', 'STRONG_BUY')
+LEVEL_EMOJIS = ('[AVOID]', '[CAUTION]', '[WATCH]', '[BUY]', '[STRONG]')
+SIZES = ('none', 'quarter', 'half', 'full')
+REGIME_CODES = {'bullish': REGIME_BULLISH, 'bearish': REGIME_BEARISH}
+
+
+# The kernel's rule tables as arrays for calculate_confidence_batch, so both
+# paths read the same thresholds and adjustments (built once, indexed per call)
+_VIX_THRESHOLDS = np.array(kernel._VIX_THRESHOLDS)
+_VIX_ADJUSTMENTS = np.array(kernel._VIX_ADJUSTMENTS)
+_VIX_RISK_FLAGS = np.array(kernel._VIX_RISK_FLAGS)
+_SPX_THRESHOLDS = np.array(kernel._SPX_THRESHOLDS)
+_SPX_BEARISH_ADJUSTMENTS = np.array(kernel._SPX_BEARISH_ADJUSTMENTS)
+_SPX_BULLISH_ADJUSTMENTS = np.array(kernel._SPX_BULLISH_ADJUSTMENTS)
+_REGIME_ADJUSTMENTS = np.array(kernel._REGIME_ADJUSTMENTS)
+_REGIME_FALLING_ADJUSTMENTS = np.array(kernel._REGIME_FALLING_ADJUSTMENTS)
+_REGIME_FALLING_RISK_FLAGS = np.array(kernel._REGIME_FALLING_RISK_FLAGS)
+_MACRO_THRESHOLDS = np.array(kernel._MACRO_THRESHOLDS)
+_MACRO_ADJUSTMENTS = np.array(kernel._MACRO_ADJUSTMENTS)
+_MACRO_RISK_FLAGS = np.array(kernel._MACRO_RISK_FLAGS)
+_FG_ADJUSTMENTS = np.array(kernel._FG_ADJUSTMENTS)
+_FG_RISK_FLAGS = np.array(kernel._FG_RISK_FLAGS)
+_LEVEL_THRESHOLDS = np.array(kernel._LEVEL_THRESHOLDS)
+_LEVELS_ARR = np.array(LEVELS)
+_LEVEL_EMOJIS_ARR = np.array(LEVEL_EMOJIS)
+_SIZES_ARR = np.array(SIZES)
+
+# Fear & Greed label -> code, for data without the 'code' field from get_fear_greed_index
+FG_LABEL_CODES = {
+    'Extreme Greed': FG_EXTREME_GREED,
+    'Greed': FG_GREED,
+    'Neutral': FG_NEUTRAL,
+    'Fear': FG_FEAR,
+    'Extreme Fear': FG_EXTREME_FEAR,
+}
+
+# Risk flag -> text template, formatted only when the strings are needed
+RISK_FACTOR_TEMPLATES = (
+    (RISK_EXTREME_VIX, "Extreme VIX ({vix:.1f}) - Market panic"),
+    (RISK_ELEVATED_VIX, "Elevated VIX ({vix:.1f})"),
+    (RISK_BEAR_MARKET, "Confirmed Bear Market (SPX {distance:.1f}% below 200MA)"),
+    (RISK_EXTREME_BEAR, "Extreme bear: Bearish macro + falling SPX"),
+    (RISK_WEAK_MACRO, "Very weak macro (score {macro:.1f}/10)"),
+    (RISK_EXTREME_GREED, "Extreme Greed - Overheated market"),
+)
+
 
 def calculate_confidence(
     base_score: float,
@@ -26,122 +86,179 @@ def calculate_confidence(
         sentiment_data: Fear & Greed data
 
     Returns:
-        Dict with confidence, level, risk_factors, recommended_size
+        Dict with confidence, level, risk_factors, risk_flags, recommended_size
     """
 
-    # 1. NORMALIZE BASE SCORE TO 0-100
-    # base_score range: -10 to +10
-    # Normalized: 0 to 100 (50 = neutral)
-    base_confidence = ((base_score + 10) / 20) * 100
-    base_confidence = max(0, min(100, base_confidence))  # Clamp
-
-    # 2. APPLY RISK ADJUSTMENTS
-    risk_factors = []
-    adjustments = 0
-
-    # VIX - Volatility Risk (Phase 4: Softened - only extreme panic matters)
-    if vix_value is not None:
-        if vix_value >= 28:  # EXTREME panic only
-            adjustments -= 15  # Reduced from -25
-            risk_factors.append(f"Extreme VIX ({vix_value:.1f}) - Market panic")
-        elif vix_value > 22:
-            adjustments -= 5  # Reduced from -15
-            risk_factors.append(f"Elevated VIX ({vix_value:.1f})")
-        elif vix_value < 15:
-            adjustments += 10
-            # No risk factor - this is positive
-
-    # SPX Trend - Bull/Bear Market (Phase 4: Only extreme bear matters)
-    spx_falling = False
+    # Phase 4 rules (softer penalties, only extreme panic/bear matters) live in
+    # _confidence_numba._calc; here we only map the inputs to floats/int codes
     if spx_trend:
         distance = spx_trend.get('distance_pct', 0)
         if not spx_trend.get('bullish', True):
-            # Check if SPX is actively falling (not just below MA)
-            spx_falling = distance < -5  # More than 5% below 200MA = confirmed bear
-
-            if spx_falling:
-                adjustments -= 12  # Reduced from -20
-                risk_factors.append(f"Confirmed Bear Market (SPX {distance:.1f}% below 200MA)")
-            else:
-                adjustments -= 3  # Light penalty for just being below MA
-                # No risk factor for minor weakness
+            spx_flag = SPX_BEARISH
         elif spx_trend.get('bullish', False):
-            if distance > 5:
-                adjustments += 15
-                # Boost for strong bull market
-            else:
-                adjustments += 5
-
-    # Macro Regime (Phase 4: Softened - only counts in extreme scenarios)
-    if macro_regime:
-        if macro_regime == 'bearish':
-            # Only penalize if BOTH bearish macro AND confirmed bear market
-            if spx_falling:
-                adjustments -= 8  # Reduced from -15
-                risk_factors.append("Extreme bear: Bearish macro + falling SPX")
-            else:
-                adjustments -= 2  # Very light penalty for just bearish macro
-        elif macro_regime == 'bullish':
-            adjustments += 10
-
-    # Macro Score (Phase 4: Lightened penalties)
-    if macro_score is not None:
-        if macro_score < 3:  # Only very weak macro matters
-            adjustments -= 5  # Reduced from -10
-            risk_factors.append(f"Very weak macro (score {macro_score:.1f}/10)")
-        elif macro_score > 7:
-            adjustments += 10
-
-    # Sentiment - Fear & Greed
-    if sentiment_data and sentiment_data.get('fearGreed'):
-        fg = sentiment_data['fearGreed']
-        fg_label = fg.get('label', '')
-
-        if 'Extreme Greed' in fg_label:
-            adjustments -= 10
-            risk_factors.append("Extreme Greed - Overheated market")
-        elif 'Extreme Fear' in fg_label:
-            adjustments += 5  # Contrarian opportunity
-
-    # 3. CALCULATE FINAL CONFIDENCE
-    final_confidence = base_confidence + adjustments
-    final_confidence = max(0, min(100, final_confidence))  # Clamp to 0-100
-
-    # 4. DETERMINE CONFIDENCE LEVEL
-    # Phase 4: Keep Phase 3 thresholds (softer penalties + trailing stop is enough)
-    if final_confidence >= 80:
-        level = "STRONG_BUY"
-        emoji = "[STRONG]"
-        recommended_size = "full"
-    elif final_confidence >= 65:
-        level = "BUY"
-        emoji = "[BUY]"
-        recommended_size = "full"
-    elif final_confidence >= 50:
-        level = "WATCH"
-        emoji = "[WATCH]"
-        recommended_size = "half"
-    elif final_confidence >= 35:
-        level = "CAUTION"
-        emoji = "[CAUTION]"
-        recommended_size = "quarter"
+            spx_flag = SPX_BULLISH
+        else:
+            spx_flag = SPX_UNKNOWN
     else:
-        level = "AVOID"
-        emoji = "[AVOID]"
-        recommended_size = "none"
+        distance = 0.0
+        spx_flag = SPX_UNKNOWN
+
+    fg_code = fear_greed_code(sentiment_data.get('fearGreed') if sentiment_data else None)
+
+    final_confidence, base_confidence, adjustments, level_code, size_code, flags = _calc(
+        float(base_score),
+        math.nan if vix_value is None else float(vix_value),
+        spx_flag,
+        float(distance),
+        REGIME_CODES.get(macro_regime, REGIME_OTHER) if macro_regime else REGIME_NONE,
+        math.nan if macro_score is None else float(macro_score),
+        fg_code
+    )
 
-    # 5. BUILD RESPONSE
     return {
         'confidence': round(final_confidence, 1),
-        'level': level,
-        'emoji': emoji,
-        'risk_factors': risk_factors,
-        'recommended_size': recommended_size,
+        'level': LEVELS[level_code],
+        'emoji': LEVEL_EMOJIS[level_code],
+        'risk_factors': risk_factors_from_flags(flags, vix_value, distance, macro_score),
+        'risk_flags': flags,
+        'recommended_size': SIZES[size_code],
         'base_confidence': round(base_confidence, 1),
         'adjustments': round(adjustments, 1),
     }
 
 
+def fear_greed_code(fear_greed: Optional[Dict]) -> int:
+    """Fear & Greed code from get_fear_greed_index data (FG_NONE if missing)"""
+    if not fear_greed:
+        return FG_NONE
+    code = fear_greed.get('code')
+    if code is None:
+        return FG_LABEL_CODES.get(fear_greed.get('label', ''), FG_NONE)
+    return code
+
+
+def calculate_confidence_batch(
+    base_scores,
+    vix=None,
+    spx_bullish=None,
+    spx_distance=None,
+    macro_regime=None,
+    macro_score=None,
+    fg_code=None
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized calculate_confidence for scoring many signals at once
+
+    Every argument is an array (or a scalar broadcast to all signals, e.g. a
+    shared VIX value). Missing numeric values are NaN, missing regime None/'',
+    missing Fear & Greed FG_NONE.
+
+    Args:
+        base_scores: Combined signal scores (-10 to +10)
+        vix: VIX level
+        spx_bullish: 1.0 if SPX bullish, 0.0 if not, NaN if unknown
+        spx_distance: SPX distance from 200MA in percent
+        macro_regime: 'bullish'/'bearish'/'transition'
+        macro_score: Macro score (0-10)
+        fg_code: Fear & Greed code (see fear_greed_code)
+
+    Returns:
+        Dict of arrays: confidence, level, emoji, recommended_size, base_confidence,
+        adjustments and risk_flags (bitmask, see risk_factors_from_flags)
+    """
+    base_scores = np.asarray(base_scores, dtype=float)
+    shape = base_scores.shape
+
+    def floats(values):
+        if values is None:
+            return np.full(shape, np.nan)
+        return np.broadcast_to(np.asarray(values, dtype=float), shape)
+
+    def labels(values):
+        if values is None:
+            return np.full(shape, '')
+        return np.broadcast_to(np.asarray(values, dtype=str), shape)
+
+    vix = floats(vix)
+    spx_bullish = floats(spx_bullish)
+    spx_distance = np.nan_to_num(floats(spx_distance), nan=0.0)  # Saknas -> 0 som i scalar-vagen
+    macro_score = floats(macro_score)
+    regime = labels(macro_regime)
+    fg = np.broadcast_to(np.asarray(FG_NONE if fg_code is None else fg_code, dtype=int), shape)
+
+    # 1. Base score -> 0-100
+    base_confidence = np.clip((base_scores + 10) / 20 * 100, 0, 100)
+
+    # 2. Risk adjustments from the kernel's tables: searchsorted(..., 'right') is its
+    # _bucket. NaN sorts past the last threshold, so missing inputs are masked to 0
+    vix_known = ~np.isnan(vix)
+    i = np.searchsorted(_VIX_THRESHOLDS, vix, side='right')
+    vix_adj = np.where(vix_known, _VIX_ADJUSTMENTS[i], 0)
+    vix_flags = np.where(vix_known, _VIX_RISK_FLAGS[i], 0)
+
+    spx_bucket = np.searchsorted(_SPX_THRESHOLDS, spx_distance, side='right')
+    spx_bear = spx_bullish == SPX_BEARISH
+    spx_bull = spx_bullish == SPX_BULLISH
+    spx_falling = spx_bear & (spx_bucket == 0)
+    spx_adj = np.where(spx_bear, _SPX_BEARISH_ADJUSTMENTS[spx_bucket],
+                       np.where(spx_bull, _SPX_BULLISH_ADJUSTMENTS[spx_bucket], 0))
+
+    regime_code = np.select(
+        [regime == '', regime == 'bullish', regime == 'bearish'],
+        [REGIME_NONE, REGIME_BULLISH, REGIME_BEARISH], REGIME_OTHER
+    )
+    regime_adj = np.where(spx_falling, _REGIME_FALLING_ADJUSTMENTS[regime_code],
+                          _REGIME_ADJUSTMENTS[regime_code])
+    regime_flags = np.where(spx_falling, _REGIME_FALLING_RISK_FLAGS[regime_code], 0)
+
+    macro_known = ~np.isnan(macro_score)
+    i = np.searchsorted(_MACRO_THRESHOLDS, macro_score, side='right')
+    macro_adj = np.where(macro_known, _MACRO_ADJUSTMENTS[i], 0)
+    macro_flags = np.where(macro_known, _MACRO_RISK_FLAGS[i], 0)
+
+    fg_known = fg >= 0
+    i = np.maximum(fg, 0)
+    fg_adj = np.where(fg_known, _FG_ADJUSTMENTS[i], 0)
+    fg_flags = np.where(fg_known, _FG_RISK_FLAGS[i], 0)
+
+    adjustments = vix_adj + spx_adj + regime_adj + macro_adj + fg_adj
+
+    # 3-4. Final confidence, level and size (STRONG_BUY and BUY both get full)
+    final_confidence = np.clip(base_confidence + adjustments, 0, 100)
+    level_idx = np.searchsorted(_LEVEL_THRESHOLDS, final_confidence, side='right')
+    size_idx = np.minimum(level_idx, len(SIZES) - 1)
+
+    risk_flags = (
+        vix_flags
+        | spx_falling * RISK_BEAR_MARKET
+        | regime_flags
+        | macro_flags
+        | fg_flags
+    )
+
+    return {
+        'confidence': np.round(final_confidence, 1),
+        'level': _LEVELS_ARR[level_idx],
+        'emoji': _LEVEL_EMOJIS_ARR[level_idx],
+        'recommended_size': _SIZES_ARR[size_idx],
+        'base_confidence': np.round(base_confidence, 1),
+        'adjustments': adjustments.astype(float),
+        'risk_flags': risk_flags,
+    }
+
+
+def risk_factors_from_flags(flags: int, vix_value: Optional[float] = None,
+                            spx_distance: Optional[float] = None,
+                            macro_score: Optional[float] = None) -> List[str]:
+    """Risk factor strings for one risk-flags mask (same text as calculate_confidence)"""
+    if not flags:
+        return []
+    return [
+        template.format(vix=vix_value, distance=spx_distance, macro=macro_score)
+        for flag, template in RISK_FACTOR_TEMPLATES if flags & flag
+    ]
+
+
 def get_confidence_description(level: str) -> str:
     """Get user-friendly description of confidence level"""
     descriptions = {
@@ -3,13 +3,144 @@ Macro Data Fetcher
 Hämtar makroekonomiska indikatorer från olika källor
 """
 
+import asyncio
+import bisect
+import contextvars
+import functools
+import math
+import os
+import threading
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
+from pathlib import Path
 import time
 
+from cache_utils import ttl_cache
+from stock_data import YAHOO_RATE_LIMITER, YAHOO_SESSION
+
+# pyarrow är valfritt - utan det hoppas diskcachen för seasonality över
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# diskcache är valfritt - utan det lever TTL-cachen bara i minnet
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+
+# VIX-baserad Fear/Greed: VIX < 12 Extreme Greed, 12-15 Greed, 15-20 Neutral,
+# 20-30 Fear, >= 30 Extreme Fear. bisect_right(FG_THRESHOLDS, vix) -> rad i FG_TABLE.
+# Radindex skickas som 'code' (0 Extreme Greed ... 4 Extreme Fear, se
+# confidence_calculator.FG_LABEL_CODES)
+FG_THRESHOLDS = (12, 15, 20, 30)
+FG_TABLE = (
+    # (label, value, emoji, color)
+    ('Extreme Greed', 85, '🤑', '#16a34a'),  # green
+    ('Greed', 70, '😊', '#22c55e'),          # light green
+    ('Neutral', 50, '😐', '#94a3b8'),        # gray
+    ('Fear', 30, '😰', '#f59e0b'),           # orange
+    ('Extreme Fear', 15, '😱', '#ef4444'),   # red
+)
+
+# Persistent kopia av _get_cached, så en omstart inom TTL slipper full refetch
+MACRO_CACHE_DIR = Path(__file__).parent / 'cache' / 'macro'
+MACRO_CACHE_SIZE_LIMIT = 50 * 1024 * 1024
+
+# Cache-nyckel för hela get_all_macro_data-svaret (samma TTL som delarna)
+ALL_MACRO_KEY = '_all'
+
+# Månadsstatistik för seasonality, en parquet-fil per (ticker, år-månad)
+SEASONALITY_CACHE_DIR = Path(__file__).parent / 'cache' / 'macro_seasonality'
+MONTH_NAMES = (
+    '', 'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
+
+# Put/Call-tolkning: < 0.7 bullish, > 1.1 bearish, annars neutral.
+# Övre gränsen är nästa float efter 1.1 så att exakt 1.1 förblir neutral
+PC_THRESHOLDS = (0.7, math.nextafter(1.1, math.inf))
+PC_INTERPRETATIONS = (
+    'Bullish - Low hedging activity',
+    'Neutral - Normal hedging activity',
+    'Bearish - High hedging activity',
+)
+
+# Market regime från VIX: < 15 bullish, > 25 bearish, annars transition
+REGIME_THRESHOLDS = (15, math.nextafter(25, math.inf))
+REGIMES = ('bullish', 'transition', 'bearish')
+
+
+def fear_greed_from_vix(vix_value: float, source: str = 'VIX-based') -> Dict:
+    """Fear & Greed-dict (value, label, code, emoji, color) för en VIX-nivå"""
+    code = bisect.bisect_right(FG_THRESHOLDS, vix_value)
+    label, value, emoji, color = FG_TABLE[code]
+    return {
+        'value': value,
+        'label': label,
+        'code': code,
+        'emoji': emoji,
+        'color': color,
+        'source': source,
+        'timestamp': _now_iso(),
+    }
+
+
+def interpret_put_call(put_call: float) -> str:
+    """Tolkning av en Put/Call-ratio"""
+    return PC_INTERPRETATIONS[bisect.bisect_right(PC_THRESHOLDS, put_call)]
+
+
+def put_call_from_vix(vix_value: float) -> Dict:
+    """
+    Uppskattad Put/Call-ratio från VIX
+
+    Rough estimation: Higher VIX = Higher Put/Call Ratio. Normal range 0.7 - 1.3,
+    VIX 15 = P/C ~0.8 (normal), VIX 30 = P/C ~1.2 (bearish)
+    """
+    estimated_pc = 0.5 + (vix_value / 40)
+    estimated_pc = min(max(estimated_pc, 0.4), 1.5)  # Clamp between 0.4 and 1.5
+    return {
+        'value': estimated_pc,
+        'interpretation': interpret_put_call(estimated_pc),
+        'source': 'VIX-based estimation',
+        'timestamp': _now_iso(),
+    }
+
+
+# Gemensam timestamp för alla delanrop i en get_all_macro_data-batch. En ContextVar
+# (inte ett attribut) så att samtidiga requests inte delar den; asyncio.to_thread
+# kopierar contexten till trådarna i async-varianten
+_BATCH_TS = contextvars.ContextVar('macro_batch_ts', default=None)
+
+
+def _now_iso() -> str:
+    """Batchens timestamp om vi är i get_all_macro_data, annars nu"""
+    return _BATCH_TS.get() or datetime.now().isoformat()
+
+
+@functools.lru_cache(maxsize=1)
+def _open_disk_cache():
+    """
+    Delad diskcache för alla MacroDataFetcher-instanser (en per Backtester),
+    öppnas vid första anropet. None om diskcache saknas (bara minnescache)
+    """
+    if diskcache is None:
+        return None
+
+    try:
+        return diskcache.Cache(str(MACRO_CACHE_DIR), size_limit=MACRO_CACHE_SIZE_LIMIT)
+    except Exception as e:
+        print(f"Warning: Macro disk cache unavailable, using memory only: {e}")
+        return None
+
+
 class MacroDataFetcher:
     """Hämtar makroekonomisk data"""
 
@@ -32,8 +163,20 @@ class MacroDataFetcher:
 
         # Cache for macro data (avoid rate limiting)
         self.cache_ttl = cache_ttl
-        self._cache = {}
-        self._cache_timestamps = {}
+        self._cache = {}  # key -> (data, timestamp)
+        self._quote_cache = {}  # (tickers, period) -> (timestamp, {ticker: DataFrame})
+        self._disk = _open_disk_cache()
+
+        # Delad keep-alive session och en yf.Ticker per symbol (skapas vid första anrop)
+        self.session = YAHOO_SESSION
+        self._ticker_objs = {}
+
+    def _ticker(self, symbol: str) -> yf.Ticker:
+        """Cachat yf.Ticker-objekt för symbolen, på den delade sessionen"""
+        ticker = self._ticker_objs.get(symbol)
+        if ticker is None:
+            ticker = self._ticker_objs[symbol] = yf.Ticker(symbol, session=self.session)
+        return ticker
 
     def _get_cached(self, key: str, fetch_func):
         """
@@ -48,128 +191,171 @@ class MacroDataFetcher:
         """
         now = time.time()
 
-        # Check if we have valid cached data
-        if key in self._cache and key in self._cache_timestamps:
-            age = now - self._cache_timestamps[key]
-            if age < self.cache_ttl:
-                # Cache hit - return cached data
-                return self._cache[key]
+        # Check if we have valid cached data (en lookup, data och timestamp i samma tupel)
+        entry = self._lookup(key)
+        if entry is not None and now - entry[1] < self.cache_ttl:
+            # Cache hit - return cached data
+            return entry[0]
 
         # Cache miss or expired - fetch new data
         try:
             data = fetch_func()
             if data is not None:
-                self._cache[key] = data
-                self._cache_timestamps[key] = now
+                self._cache[key] = (data, now)
+                # Ny deldata -> det sammansatta svaret är inaktuellt
+                if key != ALL_MACRO_KEY:
+                    self._cache.pop(ALL_MACRO_KEY, None)
+                if self._disk is not None:
+                    self._disk.set(key, (data, now), expire=self.cache_ttl)
             return data
         except Exception as e:
             # Return stale cache if available (fallback)
-            if key in self._cache:
+            if entry is not None:
                 print(f"Warning: Using stale cache for {key} due to error: {e}")
-                return self._cache[key]
+                return entry[0]
             raise
 
-    def get_dxy(self) -> Optional[Dict]:
+    def _lookup(self, key: str):
+        """(data, timestamp) från minnet, annars från diskcachen (överlever omstarter)"""
+        entry = self._cache.get(key)
+        if entry is None and self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._cache[key] = entry
+        return entry
+
+    def _is_fresh(self, key: str) -> bool:
+        """True if key is cached (memory or disk) and younger than the TTL"""
+        entry = self._lookup(key)
+        return entry is not None and time.time() - entry[1] < self.cache_ttl
+
+    def _fetch_quotes(self, tickers: List[str], period: str = '5d') -> Dict[str, pd.DataFrame]:
         """
-        Hämtar Dollar Index (DXY) data (cached for 5 min)
+        Hämtar historik för flera tickers i en batch-request (yf.download)
+
+        Args:
+            tickers: Yahoo-symboler
+            period: Tidsperiod
 
         Returns:
-            Dict med current value, change, changePercent
+            Dict ticker -> DataFrame (tom dict vid fel, anroparen faller då tillbaka)
         """
-        def fetch_dxy():
-            try:
-                ticker = yf.Ticker(self.tickers['dxy'])
-                hist = ticker.history(period='5d')
-
-                if hist.empty:
-                    return None
-
-                current_value = float(hist['Close'].iloc[-1])
-                previous_value = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_value
-                change = current_value - previous_value
-                change_percent = (change / previous_value * 100) if previous_value != 0 else 0
+        key = (tuple(tickers), period)
+        cached = self._quote_cache.get(key)
+        if cached and time.time() - cached[0] < self.cache_ttl:
+            return cached[1]
 
-                return {
-                    'value': current_value,
-                    'change': change,
-                    'changePercent': change_percent,
-                    'unit': '',
-                    'label': 'Dollar Index (DXY)',
-                    'timestamp': datetime.now().isoformat(),
-                }
-            except Exception as e:
-                print(f"Error fetching DXY: {e}")
-                return None
+        try:
+            YAHOO_RATE_LIMITER.acquire()
+            raw = yf.download(
+                tickers=' '.join(tickers),
+                period=period,
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                session=self.session
+            )
+        except Exception as e:
+            print(f"Error batch fetching {tickers}: {e}")
+            return {}
+
+        if raw is None or raw.empty:
+            return {}
+
+        frames = {}
+        if isinstance(raw.columns, pd.MultiIndex):
+            for ticker in tickers:
+                if ticker in raw.columns.get_level_values(0):
+                    frame = raw[ticker].dropna(how='all')
+                    if not frame.empty:
+                        frames[ticker] = frame
+        else:
+            frames[tickers[0]] = raw.dropna(how='all')
 
-        return self._get_cached('dxy', fetch_dxy)
+        self._quote_cache[key] = (time.time(), frames)
+        return frames
 
-    def get_vix(self) -> Optional[Dict]:
+    def _fetch_quote_summary(self, symbol: str, label: str, unit: str, name: str,
+                             hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
         """
-        Hämtar VIX (Fear Index) data (cached for 5 min)
+        Senaste kurs och förändring mot föregående dag för en ticker
+
+        Args:
+            symbol: Yahoo-symbol
+            label: Visningsnamn i svaret
+            unit: Enhet i svaret ('', '%', 'SEK')
+            name: Namn i felmeddelanden
+            hist: Förhämtad historik (från _fetch_quotes), annars hämtas 5d här
 
         Returns:
             Dict med current value, change, changePercent
         """
-        def fetch_vix():
-            try:
-                ticker = yf.Ticker(self.tickers['vix'])
-                hist = ticker.history(period='5d')
-
-                if hist.empty:
-                    return None
-
-                current_value = float(hist['Close'].iloc[-1])
-                previous_value = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_value
-                change = current_value - previous_value
-                change_percent = (change / previous_value * 100) if previous_value != 0 else 0
+        try:
+            data = hist
+            if data is None:
+                YAHOO_RATE_LIMITER.acquire()
+                data = self._ticker(symbol).history(period='5d')
 
-                return {
-                    'value': current_value,
-                    'change': change,
-                    'changePercent': change_percent,
-                    'unit': '',
-                    'label': 'VIX (Fear Index)',
-                    'timestamp': datetime.now().isoformat(),
-                }
-            except Exception as e:
-                print(f"Error fetching VIX: {e}")
+            if data.empty:
                 return None
 
-        return self._get_cached('vix', fetch_vix)
+            closes = data['Close'].to_numpy()
+            current_value = float(closes[-1])
+            previous_value = float(closes[-2]) if closes.size > 1 else current_value
+            change = current_value - previous_value
+            change_percent = (change / previous_value * 100) if previous_value != 0 else 0
+
+            return {
+                'value': current_value,
+                'change': change,
+                'changePercent': change_percent,
+                'unit': unit,
+                'label': label,
+                'timestamp': _now_iso(),
+            }
+        except Exception as e:
+            print(f"Error fetching {name}: {e}")
+            return None
 
-    def get_treasury_10y(self) -> Optional[Dict]:
+    def get_dxy(self, hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
         """
-        Hämtar 10-Year Treasury Yield data (cached for 5 min)
+        Hämtar Dollar Index (DXY) data (cached for 5 min)
+
+        Args:
+            hist: Förhämtad historik (från _fetch_quotes), annars hämtas den här
 
         Returns:
             Dict med current value, change, changePercent
         """
-        def fetch_treasury():
-            try:
-                ticker = yf.Ticker(self.tickers['treasury_10y'])
-                hist = ticker.history(period='5d')
+        return self._get_cached('dxy', lambda: self._fetch_quote_summary(
+            self.tickers['dxy'], 'Dollar Index (DXY)', '', 'DXY', hist))
 
-                if hist.empty:
-                    return None
+    def get_vix(self, hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
+        """
+        Hämtar VIX (Fear Index) data (cached for 5 min)
 
-                current_value = float(hist['Close'].iloc[-1])
-                previous_value = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_value
-                change = current_value - previous_value
-                change_percent = (change / previous_value * 100) if previous_value != 0 else 0
+        Args:
+            hist: Förhämtad historik (från _fetch_quotes), annars hämtas den här
 
-                return {
-                    'value': current_value,
-                    'change': change,
-                    'changePercent': change_percent,
-                    'unit': '%',
-                    'label': '10-Year Treasury',
-                    'timestamp': datetime.now().isoformat(),
-                }
-            except Exception as e:
-                print(f"Error fetching Treasury 10Y: {e}")
-                return None
+        Returns:
+            Dict med current value, change, changePercent
+        """
+        return self._get_cached('vix', lambda: self._fetch_quote_summary(
+            self.tickers['vix'], 'VIX (Fear Index)', '', 'VIX', hist))
+
+    def get_treasury_10y(self, hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
+        """
+        Hämtar 10-Year Treasury Yield data (cached for 5 min)
 
-        return self._get_cached('treasury_10y', fetch_treasury)
+        Args:
+            hist: Förhämtad historik (från _fetch_quotes), annars hämtas den här
+
+        Returns:
+            Dict med current value, change, changePercent
+        """
+        return self._get_cached('treasury_10y', lambda: self._fetch_quote_summary(
+            self.tickers['treasury_10y'], '10-Year Treasury', '%', 'Treasury 10Y', hist))
 
     def get_m2_money_supply(self) -> Optional[Dict]:
         """
@@ -190,7 +376,7 @@ class MacroDataFetcher:
                 'changePercent': 0.25,
                 'unit': 'B',
                 'label': 'M2 Money Supply',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': _now_iso(),
                 'note': 'Updated monthly - Latest available data',
             }
         except Exception as e:
@@ -216,13 +402,14 @@ class MacroDataFetcher:
                 'changePercent': 0.0,
                 'unit': '%',
                 'label': 'Fed Funds Rate',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': _now_iso(),
                 'note': 'Updated at FOMC meetings',
             }
         except Exception as e:
             print(f"Error fetching Fed Funds: {e}")
             return None
 
+    @ttl_cache(seconds=60)
     def get_fear_greed_index(self) -> Optional[Dict]:
         """
         Hämtar CNN Fear & Greed Index
@@ -240,53 +427,15 @@ class MacroDataFetcher:
             if not vix_data:
                 return None
 
-            vix_value = vix_data['value']
-
-            # VIX-baserad Fear/Greed calculation
-            # VIX < 12: Extreme Greed
-            # VIX 12-15: Greed
-            # VIX 15-20: Neutral
-            # VIX 20-30: Fear
-            # VIX > 30: Extreme Fear
-
-            if vix_value < 12:
-                label = 'Extreme Greed'
-                value = 85
-                emoji = '🤑'
-                color = '#16a34a'  # green
-            elif vix_value < 15:
-                label = 'Greed'
-                value = 70
-                emoji = '😊'
-                color = '#22c55e'  # light green
-            elif vix_value < 20:
-                label = 'Neutral'
-                value = 50
-                emoji = '😐'
-                color = '#94a3b8'  # gray
-            elif vix_value < 30:
-                label = 'Fear'
-                value = 30
-                emoji = '😰'
-                color = '#f59e0b'  # orange
-            else:
-                label = 'Extreme Fear'
-                value = 15
-                emoji = '😱'
-                color = '#ef4444'  # red
-
-            return {
-                'value': value,
-                'label': label,
-                'emoji': emoji,
-                'color': color,
-                'source': 'VIX-based calculation',
-                'timestamp': datetime.now().isoformat(),
-            }
+            # Endpointens payload som tidigare: egen source-text och ingen 'code'
+            fear_greed = fear_greed_from_vix(vix_data['value'], source='VIX-based calculation')
+            del fear_greed['code']
+            return fear_greed
         except Exception as e:
             print(f"Error fetching Fear & Greed Index: {e}")
             return None
 
+    @ttl_cache(seconds=60)
     def get_put_call_ratio(self) -> Optional[Dict]:
         """
         Hämtar Put/Call Ratio
@@ -300,34 +449,7 @@ class MacroDataFetcher:
         try:
             # TODO: Integrera real put/call ratio från CBOE eller alternativ källa
             # För nu, uppskattar vi baserat på VIX
-            vix_data = self.get_vix()
-            if not vix_data:
-                return None
-
-            vix_value = vix_data['value']
-
-            # Rough estimation: Higher VIX = Higher Put/Call Ratio
-            # Normal range: 0.7 - 1.3
-            # VIX 15 = P/C ~0.8 (normal)
-            # VIX 30 = P/C ~1.2 (bearish)
-
-            estimated_pc = 0.5 + (vix_value / 40)
-            estimated_pc = min(max(estimated_pc, 0.4), 1.5)  # Clamp between 0.4 and 1.5
-
-            # Interpretation
-            if estimated_pc < 0.7:
-                interpretation = 'Bullish - Low hedging activity'
-            elif estimated_pc > 1.1:
-                interpretation = 'Bearish - High hedging activity'
-            else:
-                interpretation = 'Neutral - Normal hedging activity'
-
-            return {
-                'value': estimated_pc,
-                'interpretation': interpretation,
-                'source': 'VIX-based estimation',
-                'timestamp': datetime.now().isoformat(),
-            }
+            return self.get_sentiment_data_cached(self.get_vix())['putCallRatio']
         except Exception as e:
             print(f"Error fetching Put/Call Ratio: {e}")
             return None
@@ -339,10 +461,12 @@ class MacroDataFetcher:
         Returns:
             Dict med fear/greed index och put/call ratio
         """
-        return {
-            'fearGreed': self.get_fear_greed_index(),
-            'putCallRatio': self.get_put_call_ratio(),
-        }
+        try:
+            vix_data = self.get_vix()
+        except Exception as e:
+            print(f"Error fetching sentiment data: {e}")
+            vix_data = None
+        return self.get_sentiment_data_cached(vix_data)
 
     def get_sentiment_data_cached(self, vix_data: Optional[Dict]) -> Dict:
         """
@@ -354,46 +478,16 @@ class MacroDataFetcher:
         Returns:
             Dict med fear/greed index och put/call ratio
         """
-        # Beräkna Fear & Greed från cached VIX
-        fear_greed = None
-        if vix_data:
-            vix_value = vix_data['value']
-            if vix_value < 12:
-                fear_greed = {'value': 85, 'label': 'Extreme Greed', 'emoji': '🤑', 'color': '#16a34a', 'source': 'VIX-based'}
-            elif vix_value < 15:
-                fear_greed = {'value': 70, 'label': 'Greed', 'emoji': '😊', 'color': '#22c55e', 'source': 'VIX-based'}
-            elif vix_value < 20:
-                fear_greed = {'value': 50, 'label': 'Neutral', 'emoji': '😐', 'color': '#94a3b8', 'source': 'VIX-based'}
-            elif vix_value < 30:
-                fear_greed = {'value': 30, 'label': 'Fear', 'emoji': '😰', 'color': '#f59e0b', 'source': 'VIX-based'}
-            else:
-                fear_greed = {'value': 15, 'label': 'Extreme Fear', 'emoji': '😱', 'color': '#ef4444', 'source': 'VIX-based'}
-            fear_greed['timestamp'] = datetime.now().isoformat()
-
-        # Beräkna Put/Call från cached VIX
-        put_call = None
-        if vix_data:
-            vix_value = vix_data['value']
-            estimated_pc = 0.5 + (vix_value / 40)
-            estimated_pc = min(max(estimated_pc, 0.4), 1.5)
-            if estimated_pc < 0.7:
-                interpretation = 'Bullish - Low hedging activity'
-            elif estimated_pc > 1.1:
-                interpretation = 'Bearish - High hedging activity'
-            else:
-                interpretation = 'Neutral - Normal hedging activity'
-            put_call = {
-                'value': estimated_pc,
-                'interpretation': interpretation,
-                'source': 'VIX-based estimation',
-                'timestamp': datetime.now().isoformat(),
-            }
+        # Beräkna Fear & Greed och Put/Call från cached VIX
+        if not vix_data:
+            return {'fearGreed': None, 'putCallRatio': None}
 
         return {
-            'fearGreed': fear_greed,
-            'putCallRatio': put_call,
+            'fearGreed': fear_greed_from_vix(vix_data['value']),
+            'putCallRatio': put_call_from_vix(vix_data['value']),
         }
 
+    @ttl_cache(seconds=3600)  # Korrelationer över 3 mån ändras långsamt
     def calculate_correlation(self, ticker1: str, ticker2: str, period: str = '3mo') -> Optional[float]:
         """
         Beräknar korrelation mellan två tickers
@@ -407,31 +501,34 @@ class MacroDataFetcher:
             Correlation coefficient (-1 till 1)
         """
         try:
-            # Hämta historisk data för båda tickers
-            data1 = yf.Ticker(ticker1).history(period=period)
-            data2 = yf.Ticker(ticker2).history(period=period)
-
-            if data1.empty or data2.empty:
+            # Hämta historisk data för båda tickers i en batch-request
+            frames = self._fetch_quotes([ticker1, ticker2], period=period)
+            if ticker1 not in frames or ticker2 not in frames:
                 return None
 
             # Beräkna dagliga returns
-            returns1 = data1['Close'].pct_change().dropna()
-            returns2 = data2['Close'].pct_change().dropna()
+            returns1 = frames[ticker1]['Close'].dropna().pct_change().dropna()
+            returns2 = frames[ticker2]['Close'].dropna().pct_change().dropna()
 
-            # Align dates
-            aligned = pd.DataFrame({'asset1': returns1, 'asset2': returns2}).dropna()
+            # Align dates (inner join på index), ingen mellanliggande DataFrame
+            aligned1, aligned2 = returns1.align(returns2, join='inner')
 
-            if len(aligned) < 10:  # Behöver minst 10 datapunkter
+            if len(aligned1) < 10:  # Behöver minst 10 datapunkter
                 return None
 
-            # Beräkna correlation
-            correlation = aligned['asset1'].corr(aligned['asset2'])
+            r1 = aligned1.to_numpy()
+            r2 = aligned2.to_numpy()
+
+            # Beräkna correlation (konstant serie -> NaN, som pandas corr)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                correlation = np.corrcoef(r1, r2)[0, 1]
 
             return float(correlation)
         except Exception as e:
             print(f"Error calculating correlation between {ticker1} and {ticker2}: {e}")
             return None
 
+    @ttl_cache(seconds=3600)
     def get_stock_correlations(self, stock_ticker: str, market: str = 'SE') -> Optional[Dict]:
         """
         Beräknar korrelationer mellan en aktie och major indices/commodities
@@ -450,18 +547,32 @@ class MacroDataFetcher:
             else:
                 yf_ticker = stock_ticker
 
-            correlations = {
-                'spx': self.calculate_correlation(yf_ticker, self.tickers['spx']),
-                'nasdaq': self.calculate_correlation(yf_ticker, self.tickers['nasdaq']),
-                'gold': self.calculate_correlation(yf_ticker, self.tickers['gold']),
-                'oil': self.calculate_correlation(yf_ticker, self.tickers['oil']),
-            }
+            assets = ['spx', 'nasdaq', 'gold', 'oil']
+            symbols = [yf_ticker] + [self.tickers[asset] for asset in assets]
+
+            # En batch-request för aktien + alla fyra istället för två requests per par
+            frames = self._fetch_quotes(symbols, period='3mo')
+            if yf_ticker not in frames:
+                return {asset: None for asset in assets}
+
+            # Returns per symbol på dess egna handelsdagar, korrelation över gemensamma
+            # datum (min 10 punkter, som calculate_correlation)
+            returns = pd.DataFrame({
+                symbol: frames[symbol]['Close'].dropna().pct_change()
+                for symbol in symbols if symbol in frames
+            })
+            corr = returns.corr(min_periods=10).reindex(index=[yf_ticker], columns=symbols)
+            row = corr.loc[yf_ticker]
 
-            return correlations
+            return {
+                asset: None if pd.isna(row[self.tickers[asset]]) else float(row[self.tickers[asset]])
+                for asset in assets
+            }
         except Exception as e:
             print(f"Error getting stock correlations: {e}")
             return None
 
+    @ttl_cache(seconds=3600)
     def get_market_correlations(self) -> Dict:
         """
         Hämtar korrelationer mellan major indices och commodities
@@ -471,19 +582,23 @@ class MacroDataFetcher:
         """
         try:
             assets = ['spx', 'nasdaq', 'gold', 'oil']
-            correlation_matrix = {}
-
-            for i, asset1 in enumerate(assets):
-                correlation_matrix[asset1] = {}
-                for asset2 in assets:
-                    if asset1 == asset2:
-                        correlation_matrix[asset1][asset2] = 1.0
-                    else:
-                        corr = self.calculate_correlation(
-                            self.tickers[asset1],
-                            self.tickers[asset2]
-                        )
-                        correlation_matrix[asset1][asset2] = corr
+
+            # En batch-request för alla fyra istället för två requests per par
+            frames = self._fetch_quotes([self.tickers[asset] for asset in assets], period='3mo')
+
+            # Returns per tillgång på dess egna handelsdagar, sen parvis korrelation
+            # över gemensamma datum (min 10 punkter, som calculate_correlation)
+            returns = pd.DataFrame({
+                asset: frames[self.tickers[asset]]['Close'].dropna().pct_change()
+                for asset in assets if self.tickers[asset] in frames
+            })
+            corr = returns.corr(min_periods=10).reindex(index=assets, columns=assets)
+            values = corr.to_numpy(copy=True)
+            np.fill_diagonal(values, 1.0)
+
+            # Tillgångar som saknas i batch-svaret ger None (ingen parvis omhämtning)
+            matrix = pd.DataFrame(values, index=assets, columns=assets)
+            correlation_matrix = matrix.astype(object).where(matrix.notna(), None).to_dict(orient='index')
 
             return {
                 'matrix': correlation_matrix,
@@ -493,12 +608,75 @@ class MacroDataFetcher:
                     'gold': 'Gold',
                     'oil': 'Oil',
                 },
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': _now_iso(),
             }
         except Exception as e:
             print(f"Error getting market correlations: {e}")
             return None
 
+    def _get_monthly_stats(self, ticker: str) -> Optional[pd.DataFrame]:
+        """
+        Månadsstatistik (avg_return, win_rate, occurrences per månad 1-12) över 5 år
+
+        Sparas som parquet per (ticker, år-månad) - statistiken ändras knappt inom
+        en månad, så bara första anropet varje månad hämtar 5 års data.
+
+        Returns:
+            DataFrame indexerad på månad 1-12, None om ingen data
+        """
+        path = SEASONALITY_CACHE_DIR / f"{ticker}_{datetime.now():%Y%m}.parquet"
+        if PARQUET_AVAILABLE and path.exists():
+            try:
+                return pd.read_parquet(path)
+            except Exception as e:
+                print(f"Warning: Failed to read seasonality cache for {ticker}: {e}")
+
+        # Hämta 5 års historisk data för seasonality analysis. yf.download utan
+        # actions (Dividends/Stock Splits) - bara Close används nedan
+        YAHOO_RATE_LIMITER.acquire()
+        data = yf.download(
+            ticker,
+            period='5y',
+            interval='1d',
+            auto_adjust=True,
+            actions=False,
+            progress=False,
+            session=self.session
+        )
+
+        if data is None or data.empty:
+            return None
+
+        close = data['Close']
+        if isinstance(close, pd.DataFrame):  # Nyare yfinance: (fält, ticker)-kolumner
+            close = close.iloc[:, 0]
+
+        # Dagliga returns, summerade per kalendermånad med bincount (index 0 oanvänt)
+        returns = close.pct_change().dropna()
+        values = returns.to_numpy()
+        months = returns.index.month.to_numpy()
+        counts = np.bincount(months, minlength=13)[1:].astype(float)
+        sums = np.bincount(months, weights=values, minlength=13)[1:]
+        wins = np.bincount(months, weights=values > 0, minlength=13)[1:]
+        counts[counts == 0] = np.nan  # Månad utan data -> NaN, hanteras nedan
+        stats = pd.DataFrame({
+            'avg_return': sums / counts * 100,  # Convert to percentage
+            'win_rate': wins / counts * 100,
+            'occurrences': counts,
+        }, index=range(1, 13))
+
+        if PARQUET_AVAILABLE:
+            try:
+                SEASONALITY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                # Atomisk skrivning - parallella anrop läser aldrig en halvskriven fil
+                tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+                stats.to_parquet(tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Warning: Failed to write seasonality cache for {ticker}: {e}")
+
+        return stats
+
     def get_seasonality_data(self, ticker: str = '^GSPC', market: str = 'US') -> Optional[Dict]:
         """
         Beräknar seasonality patterns för en ticker
@@ -510,89 +688,91 @@ class MacroDataFetcher:
         Returns:
             Dict med monthly performance stats
         """
-        try:
-            # Hämta 5 års historisk data för seasonality analysis
-            data = yf.Ticker(ticker).history(period='5y')
+        seasonality = self._get_seasonality(ticker, market)
+        if seasonality is None:
+            return None
 
-            if data.empty:
-                return None
+        # current_month läggs på utanför cachen så att den byter vid midnatt
+        current_month = datetime.now().month
+        current_month_stats = seasonality['monthly_stats'].get(current_month, {})
+        seasonality['current_month'] = {
+            'month': current_month,
+            'name': MONTH_NAMES[current_month],
+            'avg_return': current_month_stats.get('avg_return', 0),
+            'win_rate': current_month_stats.get('win_rate', 0),
+        }
+        return seasonality
 
-            # Beräkna monthly returns
-            data['Month'] = data.index.month
-            data['Return'] = data['Close'].pct_change()
+    # 5 års månadsdata ändras inte under dagen - en nyckel per ticker, TTL:en rullar den
+    @ttl_cache(seconds=24 * 3600)
+    def _get_seasonality(self, ticker: str, market: str) -> Optional[Dict]:
+        """get_seasonality_data utan current_month (oberoende av datumet)"""
+        try:
+            stats = self._get_monthly_stats(ticker)
+            if stats is None:
+                return None
 
-            # Group by month and calculate statistics
             monthly_stats = {}
-            for month in range(1, 13):
-                month_data = data[data['Month'] == month]['Return'].dropna()
-
-                if len(month_data) > 0:
-                    monthly_stats[month] = {
-                        'avg_return': float(month_data.mean() * 100),  # Convert to percentage
-                        'win_rate': float((month_data > 0).sum() / len(month_data) * 100),
-                        'occurrences': int(len(month_data)),
-                    }
+            for month, avg_return, win_rate, occurrences in stats.itertuples(name=None):
+                if pd.isna(occurrences):
+                    # Månad utan data
+                    monthly_stats[month] = {'avg_return': 0, 'win_rate': 0, 'occurrences': 0}
                 else:
                     monthly_stats[month] = {
-                        'avg_return': 0,
-                        'win_rate': 0,
-                        'occurrences': 0,
+                        'avg_return': float(avg_return),
+                        'win_rate': float(win_rate),
+                        'occurrences': int(occurrences),
                     }
 
-            # Find best and worst months
-            best_month = max(monthly_stats.items(), key=lambda x: x[1]['avg_return'])
-            worst_month = min(monthly_stats.items(), key=lambda x: x[1]['avg_return'])
-
-            # Current month
-            current_month = datetime.now().month
-            current_month_stats = monthly_stats.get(current_month, {})
-
-            month_names = [
-                '', 'January', 'February', 'March', 'April', 'May', 'June',
-                'July', 'August', 'September', 'October', 'November', 'December'
-            ]
+            # Find best and worst months (månader utan data räknas som 0, första vinner vid lika)
+            avg_returns = stats['avg_return'].fillna(0).to_numpy()
+            best_month = int(stats.index[avg_returns.argmax()])
+            worst_month = int(stats.index[avg_returns.argmin()])
 
             return {
                 'monthly_stats': monthly_stats,
                 'best_month': {
-                    'month': best_month[0],
-                    'name': month_names[best_month[0]],
-                    'avg_return': best_month[1]['avg_return'],
+                    'month': best_month,
+                    'name': MONTH_NAMES[best_month],
+                    'avg_return': monthly_stats[best_month]['avg_return'],
                 },
                 'worst_month': {
-                    'month': worst_month[0],
-                    'name': month_names[worst_month[0]],
-                    'avg_return': worst_month[1]['avg_return'],
+                    'month': worst_month,
+                    'name': MONTH_NAMES[worst_month],
+                    'avg_return': monthly_stats[worst_month]['avg_return'],
                 },
-                'current_month': {
-                    'month': current_month,
-                    'name': month_names[current_month],
-                    'avg_return': current_month_stats.get('avg_return', 0),
-                    'win_rate': current_month_stats.get('win_rate', 0),
-                },
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': _now_iso(),
             }
         except Exception as e:
             print(f"Error calculating seasonality: {e}")
             return None
 
-    def get_spx_trend(self) -> Optional[Dict]:
+    def get_spx_trend(self, hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
         """
         Hamtar S&P 500 pris och 200-dagars MA for bull/bear market detection (cached for 5 min)
 
+        Args:
+            hist: Redan hämtad 1 års historik (från batch-request), annars hämtas den
+
         Returns:
             Dict med SPX price, 200MA, och bull market status
         """
         def fetch_spx():
             try:
-                ticker = yf.Ticker('^GSPC')
-                hist = ticker.history(period='1y')  # 1 ar for 200-dagars MA
+                # 1 ar for 200-dagars MA
+                data = hist
+                if data is None:
+                    YAHOO_RATE_LIMITER.acquire()
+                    data = self._ticker(self.tickers['spx']).history(period='1y')
 
-                if hist.empty or len(hist) < 200:
+                if data.empty or len(data) < 200:
                     return None
 
-                current_price = float(hist['Close'].iloc[-1])
-                ma_200 = float(hist['Close'].rolling(window=200).mean().iloc[-1])
+                closes = data['Close'].to_numpy()
+                current_price = float(closes[-1])
+                # Bara senaste 200MA behovs - medel over sista 200 dagarna, ingen rolling over hela aret
+                # (nanmean hoppar over NaN som pandas mean)
+                ma_200 = float(np.nanmean(closes[-200:]))
 
                 above_ma = current_price > ma_200
                 distance_pct = ((current_price - ma_200) / ma_200) * 100
@@ -604,7 +784,7 @@ class MacroDataFetcher:
                     'distance_pct': distance_pct,
                     'bullish': above_ma,  # SPX > 200MA = bull market
                     'label': 'S&P 500 vs 200MA',
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': _now_iso(),
                 }
             except Exception as e:
                 print(f"Error fetching SPX trend: {e}")
@@ -612,29 +792,27 @@ class MacroDataFetcher:
 
         return self._get_cached('spx_trend', fetch_spx)
 
-    def get_all_macro_data(self) -> Dict:
+    def _get_quotes(self):
         """
-        Hämtar all makrodata i en request med rate limiting
+        DXY, VIX, 10Y och SPX i en batch-request - bara de som inte redan är cachade
+
+        1 års historik så att SPX 200MA ryms; de andra använder bara sista två dagarna.
 
         Returns:
-            Dict med alla makroindikatorer
+            (dxy, vix, treasury_10y, spx_trend)
         """
-        # Hämta data med delays för att undvika rate limiting
-        m2 = self.get_m2_money_supply()  # No delay, local data
-        fed_funds = self.get_fed_funds_rate()  # No delay, local data
-
-        dxy = self.get_dxy()
-        time.sleep(0.5)  # Rate limiting delay
-
-        vix = self.get_vix()  # Hämta VIX en gång och återanvänd
-        time.sleep(0.5)
-
-        treasury = self.get_treasury_10y()
-        time.sleep(0.5)
-
-        spx_trend = self.get_spx_trend()
-        time.sleep(0.5)
-
+        cache_keys = {'dxy': 'dxy', 'vix': 'vix', 'treasury_10y': 'treasury_10y', 'spx': 'spx_trend'}
+        stale = [self.tickers[key] for key, cache_key in cache_keys.items() if not self._is_fresh(cache_key)]
+        frames = self._fetch_quotes(stale, period='1y') if stale else {}
+
+        dxy = self.get_dxy(frames.get(self.tickers['dxy']))
+        vix = self.get_vix(frames.get(self.tickers['vix']))  # Hämta VIX en gång och återanvänd
+        treasury = self.get_treasury_10y(frames.get(self.tickers['treasury_10y']))
+        spx_trend = self.get_spx_trend(frames.get(self.tickers['spx']))
+        return dxy, vix, treasury, spx_trend
+
+    def _build_macro_data(self, m2, fed_funds, dxy, vix, treasury, spx_trend, seasonality) -> Dict:
+        """Sätter ihop get_all_macro_data-svaret; regime och sentiment räknas från VIX"""
         # Återanvänd cached VIX för regime och sentiment (undvik duplicerade requests)
         regime = self._calculate_market_regime_cached(vix)
         sentiment = self.get_sentiment_data_cached(vix)
@@ -642,9 +820,6 @@ class MacroDataFetcher:
         # Correlations är dyrt (16 requests), skippa för nu eller använd långsam cache
         correlations = None  # TODO: Cache correlations för 1 timme
 
-        # Seasonality är också dyrt (5 års data), cacha längre
-        seasonality = self.get_seasonality_data()
-
         return {
             'm2': m2,
             'fedFunds': fed_funds,
@@ -658,36 +833,77 @@ class MacroDataFetcher:
             'seasonality': seasonality,
         }
 
-    def get_usd_sek(self) -> Optional[Dict]:
+    def get_all_macro_data(self) -> Dict:
         """
-        Hämtar USD/SEK exchange rate
+        Hämtar all makrodata
+
+        Synkron väg för scanner, backtester och Flask-routes - ingen event loop,
+        så den går att anropa även från en tråd som redan kör en. Anropare med
+        en egen loop använder get_all_macro_data_async.
 
         Returns:
-            Dict med current value, change, changePercent
+            Dict med alla makroindikatorer
         """
+        entry = self._cache.get(ALL_MACRO_KEY)
+        if entry is not None and time.time() - entry[1] < self.cache_ttl:
+            return entry[0]
+
+        token = _BATCH_TS.set(datetime.now().isoformat())
         try:
-            ticker = yf.Ticker('USDSEK=X')
-            hist = ticker.history(period='5d')
+            dxy, vix, treasury, spx_trend = self._get_quotes()
+            result = self._build_macro_data(
+                self.get_m2_money_supply(), self.get_fed_funds_rate(),
+                dxy, vix, treasury, spx_trend, self.get_seasonality_data()
+            )
+            self._cache[ALL_MACRO_KEY] = (result, time.time())
+            return result
+        finally:
+            _BATCH_TS.reset(token)
+
+    async def get_all_macro_data_async(self) -> Dict:
+        """
+        Hämtar all makrodata, de oberoende källorna parallellt
 
-            if hist.empty:
-                return None
+        Kurserna (en batch-request) och seasonality körs i var sin tråd
+        (asyncio.to_thread), så svarstiden blir den långsammaste källans i
+        stället för summan. M2 och Fed Funds är lokal data och läses direkt.
+        Regime och sentiment räknas ut efteråt från VIX. Hela svaret cachas
+        under ALL_MACRO_KEY tills TTL:en går ut eller någon delnyckel hämtas om.
 
-            current_value = float(hist['Close'].iloc[-1])
-            previous_value = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_value
-            change = current_value - previous_value
-            change_percent = (change / previous_value * 100) if previous_value != 0 else 0
+        Returns:
+            Dict med alla makroindikatorer
+        """
+        entry = self._cache.get(ALL_MACRO_KEY)
+        if entry is not None and time.time() - entry[1] < self.cache_ttl:
+            return entry[0]
 
-            return {
-                'value': current_value,
-                'change': change,
-                'changePercent': change_percent,
-                'unit': 'SEK',
-                'label': 'USD/SEK',
-                'timestamp': datetime.now().isoformat(),
-            }
-        except Exception as e:
-            print(f"Error fetching USD/SEK: {e}")
-            return None
+        token = _BATCH_TS.set(datetime.now().isoformat())
+        try:
+            m2 = self.get_m2_money_supply()  # Local data - ingen tråd behövs
+            fed_funds = self.get_fed_funds_rate()  # Local data
+
+            # Bara nätverkskällorna i trådar (yfinance släpper GIL under I/O)
+            quotes, seasonality = await asyncio.gather(
+                asyncio.to_thread(self._get_quotes),
+                asyncio.to_thread(self.get_seasonality_data),
+            )
+            dxy, vix, treasury, spx_trend = quotes
+
+            result = self._build_macro_data(m2, fed_funds, dxy, vix, treasury, spx_trend, seasonality)
+            self._cache[ALL_MACRO_KEY] = (result, time.time())
+            return result
+        finally:
+            _BATCH_TS.reset(token)
+
+    @ttl_cache(seconds=300)
+    def get_usd_sek(self) -> Optional[Dict]:
+        """
+        Hämtar USD/SEK exchange rate
+
+        Returns:
+            Dict med current value, change, changePercent
+        """
+        return self._fetch_quote_summary('USDSEK=X', 'USD/SEK', 'SEK', 'USD/SEK')
 
     def get_macro_score(self) -> Dict:
         """
@@ -794,6 +1010,7 @@ class MacroDataFetcher:
             }
         }
 
+    @ttl_cache(seconds=60)
     def _calculate_market_regime(self) -> str:
         """
         Beräknar market regime baserat på makroindikatorer
@@ -801,10 +1018,7 @@ class MacroDataFetcher:
         Returns:
             'bullish', 'bearish', eller 'transition'
         """
-        vix_data = self.get_vix()
-        if not vix_data:
-            return 'transition'
-        return self._calculate_market_regime_cached(vix_data)
+        return self._calculate_market_regime_cached(self.get_vix())
 
     def _calculate_market_regime_cached(self, vix_data: Optional[Dict]) -> str:
         """
@@ -819,14 +1033,7 @@ class MacroDataFetcher:
         if not vix_data:
             return 'transition'
 
-        vix_value = vix_data['value']
-
-        if vix_value < 15:
-            return 'bullish'
-        elif vix_value > 25:
-            return 'bearish'
-        else:
-            return 'transition'
+        return REGIMES[bisect.bisect_right(REGIME_THRESHOLDS, vix_data['value'])]
 
 
 # Test-funktion
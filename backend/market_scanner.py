@@ -3,27 +3,199 @@ Market Scanner - OMX30 Daily Scoring
 Scores all OMX30 stocks daily for percentile-based position sizing
 """
 
-from typing import Dict, List, Tuple
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import time
 from stock_data import StockDataFetcher
 from technical_analysis import TechnicalAnalyzer
+from cache_utils import ttl_cache
 from macro_data import MacroDataFetcher
 from ai_service import ai_service
 from news_fetcher import news_fetcher
-from confidence_calculator import calculate_confidence
+from confidence_calculator import calculate_confidence_batch, fear_greed_code, risk_factors_from_flags
 from signal_modes import get_mode_config
 
 
+logger = logging.getLogger(__name__)
+
+# Mode names are a tiny closed set - resolve each config once per process
+_get_mode_cfg = functools.lru_cache(maxsize=8)(get_mode_config)
+
+# numba is optional - without it the scoring kernel runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # OMX30 Stockholm constituents (as of 2024)
-OMX30_TICKERS = [
+OMX30_TICKERS = (
     'ABB', 'ALFA', 'ASSA-B', 'ATCO-A', 'AZN', 'BOL',
     'ELUX-B', 'ERIC-B', 'ESSITY-B', 'EVO', 'GETI-B', 'HM-B',
     'HEXA-B', 'INVE-B', 'KINV-B', 'NIBE-B', 'NDA-SE',
     'SAND', 'SBB-B', 'SCA-B', 'SEB-A', 'SECU-B', 'SHB-A',
     'SKA-B', 'SKF-B', 'SWED-A', 'SWMA', 'TEL2-B', 'VOLV-B'
-]
+)
+
+# Trading bars in a '3mo' Yahoo period - window used when scoring from pre-fetched data
+SCAN_LOOKBACK_BARS = 63
+
+# Live scans batch-download prices; tickers missing from the batch are fetched in
+# parallel (network-bound) and one slow ticker times out instead of stalling the
+# pool. Yahoo throughput is still capped by YAHOO_RATE_LIMITER
+SCAN_MAX_WORKERS = 8
+SCAN_REQUEST_TIMEOUT = 10  # seconds per Yahoo request
+
+# Row layout returned by _score_stock (turned into result dicts by _build_results)
+SCAN_COLUMNS = ('ticker', 'score', 'base_score', 'price', 'rsi', 'macd', 'volume_ratio')
+
+# Technical score weights, same checks and order as in _score_stock:
+# RSI < 45, RSI 45-50, MACD bullish crossover, MACD above signal (no crossover),
+# price above MA20, MACD positive, 5-day momentum, low volume (< 0.8x avg20),
+# choppy market (ADX < 15)
+SCORE_WEIGHTS = np.array([2, 1, 3, 1, 1, 1, 1, -1, -1])
+
+# Macro inputs are shared by every stock and barely move between back-to-back scans
+MACRO_CACHE_TTL = 300  # seconds
+
+
+@njit(cache=True, error_model='numpy')
+def _rsi_last(close, period):
+    """
+    Latest TechnicalAnalyzer.calculate_rsi value from the last period+1 closes
+
+    Same SMA-of-gains/losses definition (not Wilder smoothing), so scores match
+    ai_engine and the backtester. NaN changes count as zero, as in the pandas version.
+    """
+    if len(close) < period + 1:
+        return np.nan
+    delta = np.diff(close[-(period + 1):])
+    gain = np.where(delta > 0, delta, 0.0).mean()
+    loss = np.where(delta < 0, -delta, 0.0).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+@njit(cache=True)
+def _ema(values, span):
+    """
+    pandas ewm(span=span, adjust=False).mean() as an ndarray
+
+    Same recursion as pandas, including how NaN gaps are weighted and the
+    equality check that keeps constant series exact.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty(len(values))
+    if len(values) == 0:
+        return out
+
+    weighted = values[0]
+    out[0] = weighted
+    old_wt = 1.0
+    for i in range(1, len(values)):
+        cur = values[i]
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if cur == cur:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif cur == cur:
+            weighted = cur
+        out[i] = weighted
+    return out
+
+
+@njit(cache=True)
+def _rolling_mean_tail(values, window, count):
+    """Last `count` trailing window means, NaN if the window has a NaN (pandas rolling().mean())"""
+    n = len(values)
+    out = np.empty(count)
+    for k in range(count):
+        end = n - count + k + 1
+        out[k] = values[end - window:end].sum() / window
+    return out
+
+
+@njit(cache=True, error_model='numpy')
+def _adx_last(high, low, close, period):
+    """Latest TechnicalAnalyzer.calculate_adx value (same SMA-smoothed definition)"""
+    n = len(close)
+    if n < 2 * period - 1:
+        return np.nan
+
+    # Only the bars feeding the last `period` DX values are needed
+    tr = np.empty(n)
+    tr[0] = high[0] - low[0]  # First bar has no previous close
+    tr[1:] = np.fmax(high[1:] - low[1:],
+                     np.fmax(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+
+    up_move = high[1:] - high[:-1]
+    down_move = low[:-1] - low[1:]
+    plus_dm = np.zeros(n)
+    minus_dm = np.zeros(n)
+    plus_dm[1:] = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm[1:] = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    atr = _rolling_mean_tail(tr, period, period)
+    plus_di = 100 * (_rolling_mean_tail(plus_dm, period, period) / atr)
+    minus_di = 100 * (_rolling_mean_tail(minus_dm, period, period) / atr)
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+    return dx.sum() / period
+
+
+@njit(cache=True, error_model='numpy')
+def _score_kernel(close, high, low, volume):
+    """
+    Technical score for the last bar (compiled with numba when available)
+
+    Same indicators as TechnicalAnalyzer (RSI 14, MACD 12/26/9, ADX 14) and the
+    checks in SCORE_WEIGHTS order. Needs at least 20 bars; _score_stock passes 50+.
+
+    Returns:
+        (technical_score, base_score, rsi, macd, volume_ratio)
+    """
+    macd = _ema(close, 12) - _ema(close, 26)
+    macd_signal = _ema(macd, 9)
+    rsi = _rsi_last(close, 14)
+    adx = _adx_last(high, low, close, 14)
+
+    price = close[-1]
+
+    # Volume analysis
+    avg_volume_20 = np.nanmean(volume[-20:])
+    volume_ratio = volume[-1] / avg_volume_20 if avg_volume_20 > 0 else 1.0
+
+    # 20-day MA
+    ma20 = close[-20:].mean()
+
+    # Simplified technical scoring (Phase 3 logic), one weighted sum over the checks
+    bullish_crossover = macd[-2] < macd_signal[-2] and macd[-1] > macd_signal[-1]
+    checks = (
+        rsi < 45,
+        45 <= rsi < 50,
+        bullish_crossover,
+        macd[-1] > macd_signal[-1] and not bullish_crossover,
+        price > ma20,
+        macd[-1] > 0,
+        price > close[-5],
+        volume_ratio < 0.8,
+        adx < 15,  # NaN (not enough bars) compares False
+    )
+    technical_score = 0
+    for i in range(len(checks)):
+        technical_score += SCORE_WEIGHTS[i] * checks[i]
+
+    # Convert technical score to -10 to +10 range
+    base_score = (technical_score - 5) * 2
+
+    return technical_score, base_score, rsi, macd[-1], volume_ratio
 
 
 class MarketScanner:
@@ -37,15 +209,19 @@ class MarketScanner:
         self.analyzer = TechnicalAnalyzer()
         self.macro_fetcher = MacroDataFetcher()
         self.mode = mode
-        self.mode_config = get_mode_config(mode)
+        self.mode_config = _get_mode_cfg(mode)
 
-    def scan_market(self, date: datetime = None, market: str = 'SE') -> List[Dict]:
+    def scan_market(self, date: datetime = None, market: str = 'SE',
+                    price_data: Dict[str, pd.DataFrame] = None) -> List[Dict]:
         """
         Scan all OMX30 stocks and return scores
 
         Args:
             date: Date to scan for (default: today)
             market: Market (default: SE)
+            price_data: Optional pre-fetched {ticker: OHLCV DataFrame}. When given,
+                        each stock is scored on its history up to `date` and no
+                        price requests are made.
 
         Returns:
             List of dicts with {ticker, score, confidence, details}
@@ -53,178 +229,217 @@ class MarketScanner:
         if date is None:
             date = datetime.now()
 
-        print(f"\n[Market Scanner] Scanning OMX30 for {date.strftime('%Y-%m-%d')}...")
+        logger.info("[Market Scanner] Scanning OMX30 for %s...", date.strftime('%Y-%m-%d'))
 
-        # Fetch macro data once (shared across all stocks)
+        # Fetch macro data once (shared across all stocks, and across scans within the TTL)
         try:
-            macro_data = self.macro_fetcher.get_all_macro_data()
-            vix_data = macro_data.get('vix')
-            spx_trend = macro_data.get('spx_trend')
-            macro_regime = macro_data.get('regime')
-            sentiment_data = macro_data.get('sentiment')
-            macro_score_data = self.macro_fetcher.get_macro_score()
-            macro_score = macro_score_data.get('score', 5.0) if macro_score_data else 5.0
+            vix_data, spx_trend, macro_regime, sentiment_data, macro_score = self._macro_inputs()
         except Exception as e:
-            print(f"  Warning: Could not fetch macro data: {e}")
+            logger.warning("[Market Scanner] Could not fetch macro data: %s", e)
             vix_data = None
             spx_trend = None
             macro_regime = None
             sentiment_data = None
             macro_score = 5.0
 
-        results = []
+        rows = []  # SCAN_COLUMNS tuples; dicts are built once, after confidence
         successful = 0
         failed = 0
 
+        if price_data is None:
+            # Live scan: all OMX30 history in one batch request
+            batch = self.fetcher.get_historical_data_batch(
+                OMX30_TICKERS, period='3mo', market=market, timeout=SCAN_REQUEST_TIMEOUT)
+        else:
+            batch = {ticker: self._slice_history(price_data.get(ticker), date)
+                     for ticker in OMX30_TICKERS}
+
+        def score(ticker):
+            # data=None (missing from a live batch) -> _score_stock fetches it alone
+            return self._score_stock(ticker=ticker, market=market, data=batch.get(ticker))
+
+        # Tickers the live batch missed are fetched one by one on a thread pool to
+        # overlap the Yahoo round-trips. StockDataFetcher throttles them through its
+        # shared token bucket, only when the burst is used up
+        executor = None
+        pending = []
         for ticker in OMX30_TICKERS:
+            if ticker in batch:
+                pending.append((ticker, functools.partial(score, ticker)))
+            else:
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS)
+                pending.append((ticker, executor.submit(score, ticker).result))
+
+        # Collected in OMX30 order so equal scores keep a stable order after sorting
+        for ticker, get_result in pending:
             try:
-                # Score individual stock
-                stock_result = self._score_stock(
-                    ticker=ticker,
-                    market=market,
-                    vix_data=vix_data,
-                    spx_trend=spx_trend,
-                    macro_regime=macro_regime,
-                    macro_score=macro_score,
-                    sentiment_data=sentiment_data
-                )
-
-                if stock_result:
-                    results.append(stock_result)
+                row = get_result()
+
+                if row:
+                    rows.append(row)
                     successful += 1
                 else:
                     failed += 1
 
             except Exception as e:
-                print(f"  Error scoring {ticker}: {e}")
+                logger.warning("[Market Scanner] Error scoring %s: %s", ticker, e)
                 failed += 1
-                continue
 
-            # Rate limiting: 1 second delay between stocks to avoid Yahoo Finance throttling
-            time.sleep(1.0)
+        if executor is not None:
+            executor.shutdown()
 
-        print(f"[Market Scanner] Complete: {successful} scored, {failed} failed")
+        logger.info("[Market Scanner] Complete: %d scored, %d failed", successful, failed)
 
         # Sort by score (descending)
-        results.sort(key=lambda x: x['score'], reverse=True)
+        rows.sort(key=lambda row: row[1], reverse=True)
 
-        return results
+        # Confidence for all scored stocks in one vectorized pass (macro inputs are shared)
+        return self._build_results(rows, vix_data, spx_trend, macro_regime,
+                                   macro_score, sentiment_data)
 
-    def _score_stock(self, ticker: str, market: str,
-                     vix_data: Dict, spx_trend: Dict, macro_regime: str,
-                     macro_score: float, sentiment_data: Dict) -> Dict:
+    @ttl_cache(seconds=MACRO_CACHE_TTL)
+    def _macro_inputs(self) -> Tuple:
         """
-        Score individual stock using same logic as ai_engine
+        Macro inputs for a scan, cached for MACRO_CACHE_TTL seconds
 
         Returns:
-            Dict with ticker, score, confidence, technical details
+            Tuple (vix_data, spx_trend, macro_regime, sentiment_data, macro_score).
+            Errors are raised, not cached, so the next scan retries.
         """
-        try:
-            # Fetch price data
-            data = self.fetcher.get_historical_data(ticker, period='3mo', market=market)
+        macro_data = self.macro_fetcher.get_all_macro_data()
+        macro_score_data = self.macro_fetcher.get_macro_score()
+        return (
+            macro_data.get('vix'),
+            macro_data.get('spx_trend'),
+            macro_data.get('regime'),
+            macro_data.get('sentiment'),
+            macro_score_data.get('score', 5.0) if macro_score_data else 5.0,
+        )
+
+    @staticmethod
+    def _slice_history(data: pd.DataFrame, date: datetime) -> pd.DataFrame:
+        """Bars up to and including `date`, limited to the scan lookback window"""
+        if data is None or data.empty:
+            return pd.DataFrame()
+
+        cutoff = pd.Timestamp(date)
+        if data.index.tz is not None:
+            cutoff = cutoff.tz_localize(data.index.tz)
+
+        return data[data.index <= cutoff].tail(SCAN_LOOKBACK_BARS)
+
+    @staticmethod
+    def _build_results(rows: List[Tuple], vix_data: Dict, spx_trend: Dict,
+                       macro_regime: str, macro_score: float, sentiment_data: Dict) -> List[Dict]:
+        """
+        Result dicts for the scored stocks, with confidence from calculate_confidence_batch
 
-            if data.empty or len(data) < 50:
-                return None
+        Uses Phase 4 softer penalties, same as calculate_confidence per stock.
 
-            # Calculate technical indicators
-            rsi = self.analyzer.calculate_rsi(data, period=14)
-            macd, macd_signal, macd_hist = self.analyzer.calculate_macd(data)
-            adx, plus_di, minus_di = self.analyzer.calculate_adx(data)
-
-            # Get latest values
-            current_rsi = rsi.iloc[-1]
-            current_macd = macd.iloc[-1]
-            current_macd_signal = macd_signal.iloc[-1]
-            current_price = data['Close'].iloc[-1]
-            current_volume = data['Volume'].iloc[-1]
-
-            # Volume analysis
-            avg_volume_20 = data['Volume'].tail(20).mean()
-            volume_ratio = current_volume / avg_volume_20 if avg_volume_20 > 0 else 1.0
-
-            # Calculate 20-day MA
-            ma20 = data['Close'].rolling(window=20).mean().iloc[-1]
-
-            # Simplified technical scoring (Phase 3 logic)
-            technical_score = 0
-
-            # RSI
-            if current_rsi < 45:
-                technical_score += 2
-            elif current_rsi < 50:
-                technical_score += 1
-
-            # MACD
-            if len(macd) > 1:
-                prev_macd = macd.iloc[-2]
-                prev_macd_signal = macd_signal.iloc[-2]
-                if prev_macd < prev_macd_signal and current_macd > current_macd_signal:
-                    technical_score += 3  # Bullish crossover
-                elif current_macd > current_macd_signal:
-                    technical_score += 1
-
-            # Price vs MA
-            if current_price > ma20:
-                technical_score += 1
-
-            # MACD positive
-            if current_macd > 0:
-                technical_score += 1
-
-            # Momentum
-            if len(data) >= 5:
-                price_5d_ago = data['Close'].iloc[-5]
-                if current_price > price_5d_ago:
-                    technical_score += 1
-
-            # Volume filter
-            if volume_ratio < 0.8:
-                technical_score -= 1  # Penalty for low volume
-
-            # ADX filter (trend strength)
-            if not pd.isna(adx.iloc[-1]) and adx.iloc[-1] < 15:
-                technical_score -= 1  # Penalty for choppy market
-
-            # Convert technical score to -10 to +10 range
-            base_score = (technical_score - 5) * 2
-
-            # Calculate confidence using Phase 4 softer penalties
-            vix_value = vix_data.get('value') if vix_data else None
-
-            confidence_result = calculate_confidence(
-                base_score=base_score,
-                vix_value=vix_value,
-                spx_trend=spx_trend,
-                macro_regime=macro_regime,
-                macro_score=macro_score,
-                sentiment_data=sentiment_data
-            )
-
-            return {
+        Args:
+            rows: SCAN_COLUMNS tuples from _score_stock
+
+        Returns:
+            One dict per row, in row order
+        """
+        if not rows:
+            return []
+
+        vix_value = vix_data.get('value') if vix_data else None
+        spx_bullish = np.nan
+        spx_distance = np.nan
+        if spx_trend:
+            spx_distance = spx_trend.get('distance_pct', 0)
+            if 'bullish' in spx_trend:
+                spx_bullish = 1.0 if spx_trend['bullish'] else 0.0
+        fg_code = fear_greed_code(sentiment_data.get('fearGreed') if sentiment_data else None)
+
+        batch = calculate_confidence_batch(
+            [row[2] for row in rows],
+            vix=np.nan if vix_value is None else vix_value,
+            spx_bullish=spx_bullish,
+            spx_distance=spx_distance,
+            macro_regime=macro_regime,
+            macro_score=np.nan if macro_score is None else macro_score,
+            fg_code=fg_code
+        )
+
+        confidence = batch['confidence'].tolist()
+        levels = batch['level'].tolist()
+        sizes = batch['recommended_size'].tolist()
+        risk_flags = batch['risk_flags'].tolist()
+
+        return [
+            {
                 'ticker': ticker,
-                'score': technical_score,  # Raw technical score (0-10+)
+                'score': score,  # Raw technical score (0-10+)
                 'base_score': base_score,  # Normalized (-10 to +10)
-                'confidence': confidence_result['confidence'],
-                'confidence_level': confidence_result['level'],
-                'recommended_size': confidence_result['recommended_size'],
-                'price': current_price,
-                'rsi': current_rsi,
-                'macd': current_macd,
+                'confidence': confidence[i],
+                'confidence_level': levels[i],
+                'recommended_size': sizes[i],
+                'price': price,
+                'rsi': rsi,
+                'macd': macd,
                 'volume_ratio': volume_ratio,
-                'risk_factors': confidence_result['risk_factors']
+                'risk_factors': risk_factors_from_flags(
+                    risk_flags[i], vix_value, spx_distance, macro_score),
             }
+            for i, (ticker, score, base_score, price, rsi, macd, volume_ratio) in enumerate(rows)
+        ]
+
+    def _score_stock(self, ticker: str, market: str, data: pd.DataFrame = None) -> Optional[Tuple]:
+        """
+        Score individual stock using same logic as ai_engine
+
+        Confidence is added afterwards for all stocks at once (see _build_results).
+
+        Returns:
+            Tuple in SCAN_COLUMNS order, or None if the stock can't be scored
+        """
+        try:
+            # Fetch price data (unless pre-fetched)
+            if data is None:
+                data = self.fetcher.get_historical_data(ticker, period='3mo', market=market,
+                                                        timeout=SCAN_REQUEST_TIMEOUT)
+
+            if data.empty or len(data) < 50:
+                return None
+
+            # Liquidity pre-filter before any indicator work: no traded volume over the
+            # last 20 bars, or no valid last close (also stale all-NaN batch symbols)
+            close_arr = data['Close'].to_numpy(dtype=float)
+            volume_arr = data['Volume'].to_numpy(dtype=float)
+            if not close_arr[-1] > 0 or not np.nansum(volume_arr[-20:]) > 0:
+                return None
+
+            # Score the last bar in the compiled kernel (contiguous float64 arrays)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                technical_score, base_score, current_rsi, current_macd, volume_ratio = _score_kernel(
+                    close_arr, data['High'].to_numpy(dtype=float),
+                    data['Low'].to_numpy(dtype=float), volume_arr)
+            current_price = close_arr[-1]
+
+            return (ticker, int(technical_score), int(base_score), current_price,
+                    current_rsi, current_macd, volume_ratio)
 
         except Exception as e:
-            # print(f"    Error in _score_stock for {ticker}: {e}")
+            logger.debug("Error in _score_stock for %s: %s", ticker, e)
             return None
 
 
+# Compile (or load from the numba cache) now so the first scan doesn't pay for it
+with np.errstate(divide='ignore', invalid='ignore'):
+    _score_kernel(*(np.linspace(1.0, 2.0, 50),) * 4)
+
 # Singleton instance
 market_scanner = MarketScanner()
 
 
 # Test
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     print("Testing Market Scanner...")
     print("=" * 70)
 
@@ -3,9 +3,21 @@ News Fetcher
 Hämtar news headlines från yfinance för AI sentiment analysis
 """
 
+import functools
 import yfinance as yf
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from cache_utils import ttl_cache
+from stock_data import YAHOO_SESSION
+
+# Rubriker ändras på minutskala - 10 min cache per ticker räcker
+NEWS_CACHE_TTL = 600
+
+
+@functools.lru_cache(maxsize=256)
+def _news_ticker(symbol: str) -> yf.Ticker:
+    """Återanvänt yf.Ticker-objekt per symbol (LRU), på den delade sessionen"""
+    return yf.Ticker(symbol, session=YAHOO_SESSION)
 
 
 class NewsFetcher:
@@ -14,7 +26,32 @@ class NewsFetcher:
     """
 
     def __init__(self):
-        pass
+        self._symbols: Dict[tuple, str] = {}  # (ticker, market) -> Yahoo-symbol
+
+    def _symbol(self, ticker: str, market: str) -> str:
+        """Yahoo-symbol för tickern (.ST-suffix för SE), memoiserad"""
+        key = (ticker, market)
+        symbol = self._symbols.get(key)
+        if symbol is None:
+            symbol = ticker
+            if market == 'SE' and not ticker.endswith('.ST'):
+                symbol = f"{ticker}.ST"
+            self._symbols[key] = symbol
+        return symbol
+
+    @ttl_cache(seconds=NEWS_CACHE_TTL)
+    def _fetch_news(self, symbol: str) -> Optional[List[Dict]]:
+        """
+        Rå yfinance-news för en Yahoo-symbol, cachad NEWS_CACHE_TTL sekunder
+
+        Delas av get_news_headlines och get_news_with_metadata (en request per
+        symbol). Returnerar None vid fel, som inte cachas.
+        """
+        try:
+            return _news_ticker(symbol).news or []
+        except Exception as e:
+            print(f"Error fetching news for {symbol}: {e}")
+            return None
 
     def get_news_headlines(self, ticker: str, market: str = 'US', limit: int = 10) -> List[str]:
         """
@@ -30,15 +67,10 @@ class NewsFetcher:
         """
         try:
             # Format ticker for yfinance
-            if market == 'SE':
-                if not ticker.endswith('.ST'):
-                    ticker = f"{ticker}.ST"
+            ticker = self._symbol(ticker, market)
 
-            # Fetch ticker data
-            stock = yf.Ticker(ticker)
-
-            # Get news (yfinance .news property)
-            news_data = stock.news
+            # Get news (yfinance .news property, cached per ticker)
+            news_data = self._fetch_news(ticker)
 
             if not news_data:
                 return []
@@ -75,15 +107,10 @@ class NewsFetcher:
         """
         try:
             # Format ticker for yfinance
-            if market == 'SE':
-                if not ticker.endswith('.ST'):
-                    ticker = f"{ticker}.ST"
-
-            # Fetch ticker data
-            stock = yf.Ticker(ticker)
+            ticker = self._symbol(ticker, market)
 
-            # Get news
-            news_data = stock.news
+            # Get news (cached per ticker)
+            news_data = self._fetch_news(ticker)
 
             if not news_data:
                 return []
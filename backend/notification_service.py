@@ -3,18 +3,115 @@ Notification Service for MarketsAI
 Hanterar push-notifikationer till mobila enheter via Expo Push
 """
 
+import asyncio
+import gzip
+import os
 import requests
 import json
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
+# orjson is optional - snabbare JSON-encoding/parsning av push-requests
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# aiohttp is optional - async fanout av stora push-utskick utan en trad per request
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Redis is optional - delar token-registret mellan gunicorn-workers
+try:
+    import redis
+except ImportError:
+    redis = None
+
+PUSH_TOKENS_KEY = 'push_tokens'
+
+
+def _dumps(obj) -> bytes:
+    """JSON-body som bytes (orjson om det finns)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _loads(content: bytes):
+    """Parsa ett JSON-svar (orjson om det finns)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Alla giltiga Expo push tokens borjar med detta prefix
+_TOKEN_PREFIX = 'ExponentPushToken'
+
+
+def _is_push_token(push_token: Optional[str]) -> bool:
+    """Snabb formatkontroll av en Expo push token"""
+    return bool(push_token) and push_token.startswith(_TOKEN_PREFIX)
+
+
+# Expo tar max 100 meddelanden per request; storre batcher delas och skickas parallellt
+EXPO_MAX_BATCH = 100
+PUSH_MAX_WORKERS = 4
+
+# Expo svarar 429 vid throttling och 5xx vid tillfalliga fel - forsok igen med backoff
+PUSH_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['POST'],
+    raise_on_status=False,
+)
+
+# Async-vagen: max samtidiga requests mot Expo och timeout per request (sekunder)
+PUSH_MAX_CONCURRENCY = 20
+PUSH_ASYNC_TIMEOUT = 10
+
 
 class NotificationService:
     """Service for att skicka push-notifikationer"""
 
     def __init__(self):
         self.expo_push_url = "https://exp.host/--/api/v2/push/send"
-        self.push_tokens = {}  # User ID -> Push Token mapping
+        self.push_tokens = {}  # User ID -> Push Token mapping (fallback utan Redis)
+        self.redis = self._connect_redis()
+        self.session = self._create_session()
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Keep-alive session mot Expo - TCP/TLS-handskakningen gors bara en gang"""
+        session = requests.Session()
+        session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=PUSH_RETRY)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def _connect_redis():
+        """Anslut till Redis om REDIS_URL ar satt, annars None (in-memory fallback)"""
+        redis_url = os.getenv('REDIS_URL')
+        if redis is None or not redis_url:
+            return None
+
+        try:
+            client = redis.Redis.from_url(redis_url, decode_responses=True)
+            client.ping()
+            return client
+        except Exception as e:
+            print(f"[WARN] Redis unavailable, using in-memory push tokens: {e}")
+            return None
 
     def register_push_token(self, user_id: str, push_token: str) -> bool:
         """
@@ -27,14 +124,20 @@ class NotificationService:
         Returns:
             bool: True om lyckad
         """
-        if not push_token or not push_token.startswith('ExponentPushToken'):
+        if not _is_push_token(push_token):
             return False
 
-        self.push_tokens[user_id] = push_token
+        if self.redis is not None:
+            self.redis.hset(PUSH_TOKENS_KEY, user_id, push_token)
+        else:
+            self.push_tokens[user_id] = push_token
         return True
 
     def remove_push_token(self, user_id: str) -> bool:
         """Ta bort push token for en anvandare"""
+        if self.redis is not None:
+            return self.redis.hdel(PUSH_TOKENS_KEY, user_id) > 0
+
         if user_id in self.push_tokens:
             del self.push_tokens[user_id]
             return True
@@ -63,32 +166,17 @@ class NotificationService:
         Returns:
             bool: True om lyckad
         """
-        if not push_token or not push_token.startswith('ExponentPushToken'):
+        if not _is_push_token(push_token):
             print(f"Invalid push token: {push_token}")
             return False
 
-        message = {
-            "to": push_token,
-            "title": title,
-            "body": body,
-            "data": data or {},
-            "priority": priority,
-            "sound": sound,
-            "channelId": "default",
-        }
+        message = self._build_message(push_token, title, body, data, priority, sound)
 
         try:
-            response = requests.post(
-                self.expo_push_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                },
-                data=json.dumps(message)
-            )
+            response = self.session.post(self.expo_push_url, data=_dumps(message))
 
             if response.status_code == 200:
-                result = response.json()
+                result = _loads(response.content)
                 if result.get('data', {}).get('status') == 'ok':
                     print(f"Notification sent successfully to {push_token[:20]}...")
                     return True
@@ -110,6 +198,9 @@ class NotificationService:
         """
         Skicka bulk-notifikationer till flera enheter
 
+        Synkron vag (trad-pool, ingen event loop). Anropare med en egen loop
+        anvander send_bulk_async.
+
         Args:
             messages: Lista med notifikationsmeddelanden
 
@@ -119,27 +210,165 @@ class NotificationService:
         if not messages:
             return {"success": 0, "failed": 0}
 
+        chunks = self._chunks(messages)
+        if len(chunks) == 1:
+            success, failed = self._send_chunk(chunks[0])
+            return {"success": success, "failed": failed}
+
+        totals = {"success": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=min(PUSH_MAX_WORKERS, len(chunks))) as executor:
+            futures = [executor.submit(self._send_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                success, failed = future.result()
+                totals["success"] += success
+                totals["failed"] += failed
+        return totals
+
+    async def send_bulk_async(self, messages: List[Dict]) -> Dict[str, int]:
+        """
+        Skicka bulk-notifikationer asynkront (aiohttp), max PUSH_MAX_CONCURRENCY
+        requests samtidigt. Utan aiohttp kors den trad-baserade vagen i en trad.
+
+        Args:
+            messages: Lista med notifikationsmeddelanden
+
+        Returns:
+            Dict med success/failed counts
+        """
+        if not messages:
+            return {"success": 0, "failed": 0}
+        if aiohttp is None:
+            return await asyncio.to_thread(self.send_bulk_notifications, messages)
+
+        semaphore = asyncio.Semaphore(PUSH_MAX_CONCURRENCY)
+
+        async def post(session, chunk):
+            async with semaphore:
+                return await self._send_chunk_async(session, chunk)
+
+        # aiohttp-sessionen ar bunden till event-loopen, sa en per utskick
+        async with self._async_session() as session:
+            results = await asyncio.gather(*(post(session, chunk) for chunk in self._chunks(messages)))
+
+        return {
+            "success": sum(success for success, _ in results),
+            "failed": sum(failed for _, failed in results),
+        }
+
+    async def send_notification_async(
+        self,
+        push_token: str,
+        title: str,
+        body: str,
+        data: Optional[Dict] = None,
+        priority: str = "high",
+        sound: str = "default"
+    ) -> bool:
+        """Async-variant av send_notification (samma argument och returvarde)"""
+        if aiohttp is None:
+            return await asyncio.to_thread(
+                self.send_notification, push_token, title, body, data, priority, sound
+            )
+
+        if not _is_push_token(push_token):
+            print(f"Invalid push token: {push_token}")
+            return False
+
+        message = self._build_message(push_token, title, body, data, priority, sound)
+
+        try:
+            async with self._async_session() as session:
+                status, content = await self._post_async(session, _dumps(message), {})
+
+            if status == 200:
+                result = _loads(content)
+                if result.get('data', {}).get('status') == 'ok':
+                    print(f"Notification sent successfully to {push_token[:20]}...")
+                    return True
+                print(f"Notification failed: {result}")
+                return False
+
+            print(f"HTTP error {status}: {content[:200]!r}")
+            return False
+
+        except Exception as e:
+            print(f"Error sending notification: {str(e)}")
+            return False
+
+    @staticmethod
+    def _chunks(messages: List[Dict]) -> List[List[Dict]]:
+        """Dela upp meddelanden i batcher om EXPO_MAX_BATCH"""
+        it = iter(messages)
+        return list(iter(lambda: list(islice(it, EXPO_MAX_BATCH)), []))
+
+    @staticmethod
+    def _build_message(push_token, title, body, data, priority, sound) -> Dict:
+        """Expo-meddelande for en enhet"""
+        return {
+            "to": push_token,
+            "title": title,
+            "body": body,
+            "data": data or {},
+            "priority": priority,
+            "sound": sound,
+            "channelId": "default",
+        }
+
+    @staticmethod
+    def _async_session():
+        """aiohttp-session med samma headers som den synkrona sessionen"""
+        return aiohttp.ClientSession(
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=PUSH_ASYNC_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=PUSH_MAX_CONCURRENCY),
+        )
+
+    async def _post_async(self, session, payload: bytes, headers: Dict) -> Tuple[int, bytes]:
+        """POST mot Expo med samma retry-policy som PUSH_RETRY (429/5xx, exponentiell backoff)"""
+        for attempt in range(PUSH_RETRY.total + 1):
+            async with session.post(self.expo_push_url, data=payload, headers=headers) as response:
+                status = response.status
+                content = await response.read()
+            if status not in PUSH_RETRY.status_forcelist or attempt == PUSH_RETRY.total:
+                return status, content
+            await asyncio.sleep(PUSH_RETRY.backoff_factor * (2 ** attempt))
+
+    async def _send_chunk_async(self, session, chunk: List[Dict]) -> Tuple[int, int]:
+        """Async-variant av _send_chunk"""
+        try:
+            status, content = await self._post_async(
+                session, gzip.compress(_dumps(chunk)), {"Content-Encoding": "gzip"}
+            )
+
+            if status == 200:
+                results = _loads(content).get('data', [])
+                success = sum(1 for r in results if r.get('status') == 'ok')
+                return success, len(results) - success
+            return 0, len(chunk)
+
+        except Exception as e:
+            print(f"Error sending bulk notifications: {str(e)}")
+            return 0, len(chunk)
+
+    def _send_chunk(self, chunk: List[Dict]) -> Tuple[int, int]:
+        """Skicka upp till EXPO_MAX_BATCH meddelanden i en gzip-komprimerad request"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.expo_push_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                },
-                data=json.dumps(messages)
+                headers={"Content-Encoding": "gzip"},
+                data=gzip.compress(_dumps(chunk))
             )
 
             if response.status_code == 200:
-                results = response.json().get('data', [])
+                results = _loads(response.content).get('data', [])
                 success = sum(1 for r in results if r.get('status') == 'ok')
-                failed = len(results) - success
-                return {"success": success, "failed": failed}
+                return success, len(results) - success
             else:
-                return {"success": 0, "failed": len(messages)}
+                return 0, len(chunk)
 
         except Exception as e:
             print(f"Error sending bulk notifications: {str(e)}")
-            return {"success": 0, "failed": len(messages)}
+            return 0, len(chunk)
 
     def notify_new_signal(
         self,
@@ -210,6 +439,14 @@ class NotificationService:
             }
         )
 
+    def get_push_token(self, user_id: str) -> Optional[str]:
+        """Hamta push token for en anvandare (O(1) hash lookup)"""
+        if self.redis is not None:
+            return self.redis.hget(PUSH_TOKENS_KEY, user_id)
+        return self.push_tokens.get(user_id)
+
     def get_registered_tokens(self) -> Dict[str, str]:
         """Hamta alla registrerade tokens"""
+        if self.redis is not None:
+            return self.redis.hgetall(PUSH_TOKENS_KEY)
         return self.push_tokens.copy()
@@ -6,15 +6,43 @@ across all OMX30 stocks to find the best performing strategy.
 
 import json
 from datetime import datetime
-from backtester import Backtester
+import pandas as pd
+from backtester import Backtester, run_many
 from tickers import OMX30_TICKERS
 
+# orjson is optional - faster per-record serialization of the results file
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configuration
 START_DATE = "2024-01-01"
 END_DATE = "2025-01-01"
 INITIAL_CAPITAL = 100000
 MODES = ["conservative", "aggressive", "ai-hybrid"]
 
+OUTPUT_FILE = "omx30_backtest_results_2024.json"
+
+# Metrics averaged per mode in the summary
+SUMMARY_COLUMNS = ["total_return", "win_rate", "total_trades", "sharpe_ratio", "max_drawdown"]
+
+def _dumps(record):
+    """Serialize one result record to a JSON string"""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(record)
+
+def _prefetch_price_data():
+    """Load each stock's history once in the parent so workers never hit Yahoo themselves"""
+    price_data = {}
+    for ticker in OMX30_TICKERS:
+        bt = Backtester(ticker=ticker, market='SE', start_date=START_DATE, end_date=END_DATE)
+        data = bt.fetch_price_data()
+        if data is not None:
+            price_data[ticker] = data
+    return price_data
+
 def run_benchmark():
     """Run complete benchmark across all OMX30 stocks and modes"""
 
@@ -40,34 +68,40 @@ def run_benchmark():
         "results": []
     }
 
-    # Run backtests
-    total_tests = len(OMX30_TICKERS) * len(MODES)
-    current_test = 0
-
-    for ticker in OMX30_TICKERS:
-        print(f"\n[{ticker}]")
-
-        for mode in MODES:
-            current_test += 1
+    # Run backtests - independent and CPU-bound, so one process per core.
+    # Prices are fetched here once; workers only simulate.
+    price_data = _prefetch_price_data()
+    jobs = [(ticker, mode) for ticker in OMX30_TICKERS for mode in MODES]
+    configs = [
+        {
+            "ticker": ticker,
+            "market": 'SE',
+            "start_date": START_DATE,
+            "end_date": END_DATE,
+            "initial_capital": INITIAL_CAPITAL,
+            "mode": mode,
+            "price_data": price_data.get(ticker)
+        }
+        for ticker, mode in jobs
+    ]
+    total_tests = len(jobs)
+    results_by_job = {}
+
+    # Stream records to disk as they complete so a late crash keeps finished backtests
+    out = open(OUTPUT_FILE, 'w')
+    out.write('{"config": ' + _dumps(all_results["config"]) + ', "results": [\n')
+    first_record = True
+
+    with out:
+        for current_test, (config, result, error) in enumerate(run_many(configs), 1):
+            ticker, mode = config["ticker"], config["mode"]
             progress = (current_test / total_tests) * 100
 
-            try:
-                # Run backtest
-                bt = Backtester(
-                    ticker=ticker,
-                    market='SE',
-                    start_date=START_DATE,
-                    end_date=END_DATE,
-                    initial_capital=INITIAL_CAPITAL,
-                    mode=mode
-                )
-                result = bt.run()
-
-                # Extract key metrics
+            if error is None:
                 metrics = result['metrics']
 
                 # Store result
-                all_results["results"].append({
+                results_by_job[(ticker, mode)] = {
                     "ticker": ticker,
                     "mode": mode,
                     "total_return": metrics.get("total_return", 0),
@@ -78,28 +112,33 @@ def run_benchmark():
                     "max_drawdown": metrics.get("max_drawdown", 0),
                     "profit_factor": metrics.get("profit_factor", 0),
                     "final_value": metrics.get("final_value", INITIAL_CAPITAL)
-                })
+                }
 
-                # Print progress
-                print(f"  {mode:12s}: Return {metrics.get('total_return', 0):+6.1f}%, "
+                # Print progress (completion order)
+                print(f"  [{ticker}] {mode:12s}: Return {metrics.get('total_return', 0):+6.1f}%, "
                       f"Trades {metrics.get('total_trades', 0):3d}, "
                       f"Win Rate {metrics.get('win_rate', 0):5.1f}% "
                       f"[{progress:5.1f}%]")
 
-            except Exception as e:
-                print(f"  {mode:12s}: ERROR - {str(e)[:50]}")
-                all_results["results"].append({
+            else:
+                print(f"  [{ticker}] {mode:12s}: ERROR - {str(error)[:50]}")
+                results_by_job[(ticker, mode)] = {
                     "ticker": ticker,
                     "mode": mode,
-                    "error": str(e)
-                })
+                    "error": str(error)
+                }
 
-    # Save raw results
-    output_file = "omx30_backtest_results_2024.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+            # Only this (main) process writes, so no lock is needed
+            out.write(('' if first_record else ',\n') + _dumps(results_by_job[(ticker, mode)]))
+            out.flush()
+            first_record = False
 
-    print(f"\n\nResults saved to: {output_file}")
+        out.write('\n]}\n')
+
+    # Keep the returned results in ticker/mode order regardless of completion order
+    all_results["results"] = [results_by_job[job] for job in jobs]
+
+    print(f"\n\nResults saved to: {OUTPUT_FILE}")
 
     # Generate summary
     generate_summary(all_results)
@@ -121,93 +160,85 @@ def generate_summary(results):
         print("No valid results to analyze!")
         return
 
+    df = pd.DataFrame(valid_results)
+    by_mode = df.groupby('mode')
+
     # 1. Mode Comparison
     print("\n1. MODE COMPARISON (Average Performance)")
     print("-" * 80)
 
+    tested_modes = [mode for mode in MODES if mode in by_mode.groups]
+    mode_means = by_mode[SUMMARY_COLUMNS].mean().reindex(tested_modes)
+    mode_counts = by_mode.size()
+
     mode_stats = {}
-    for mode in MODES:
-        mode_results = [r for r in valid_results if r["mode"] == mode]
-
-        if mode_results:
-            avg_return = sum(r["total_return"] for r in mode_results) / len(mode_results)
-            avg_win_rate = sum(r["win_rate"] for r in mode_results) / len(mode_results)
-            avg_trades = sum(r["total_trades"] for r in mode_results) / len(mode_results)
-            avg_sharpe = sum(r["sharpe_ratio"] for r in mode_results) / len(mode_results)
-            avg_drawdown = sum(r["max_drawdown"] for r in mode_results) / len(mode_results)
-
-            mode_stats[mode] = {
-                "avg_return": avg_return,
-                "avg_win_rate": avg_win_rate,
-                "avg_trades": avg_trades,
-                "avg_sharpe": avg_sharpe,
-                "avg_drawdown": avg_drawdown,
-                "count": len(mode_results)
-            }
-
-            print(f"\n{mode.upper()}")
-            print(f"  Avg Return:    {avg_return:+7.2f}%")
-            print(f"  Avg Win Rate:  {avg_win_rate:7.2f}%")
-            print(f"  Avg Trades:    {avg_trades:7.1f}")
-            print(f"  Avg Sharpe:    {avg_sharpe:7.2f}")
-            print(f"  Avg Drawdown:  {avg_drawdown:7.2f}%")
-            print(f"  Tested Stocks: {len(mode_results)}")
+    for mode, row in mode_means.iterrows():
+        mode_stats[mode] = {
+            "avg_return": row["total_return"],
+            "avg_win_rate": row["win_rate"],
+            "avg_trades": row["total_trades"],
+            "avg_sharpe": row["sharpe_ratio"],
+            "avg_drawdown": row["max_drawdown"],
+            "count": int(mode_counts[mode])
+        }
+
+        print(f"\n{mode.upper()}")
+        print(f"  Avg Return:    {row['total_return']:+7.2f}%")
+        print(f"  Avg Win Rate:  {row['win_rate']:7.2f}%")
+        print(f"  Avg Trades:    {row['total_trades']:7.1f}")
+        print(f"  Avg Sharpe:    {row['sharpe_ratio']:7.2f}")
+        print(f"  Avg Drawdown:  {row['max_drawdown']:7.2f}%")
+        print(f"  Tested Stocks: {mode_counts[mode]}")
 
     # Determine best mode
-    best_mode = max(mode_stats.items(), key=lambda x: x[1]["avg_return"])
-    print(f"\n** BEST MODE: {best_mode[0].upper()} (Avg Return: {best_mode[1]['avg_return']:+.2f}%) **")
+    best_mode = mode_means["total_return"].idxmax()
+    print(f"\n** BEST MODE: {best_mode.upper()} (Avg Return: {mode_means.at[best_mode, 'total_return']:+.2f}%) **")
 
     # 2. Top 10 Stocks (by return, any mode)
     print("\n\n2. TOP 10 STOCKS (Best Performance)")
     print("-" * 80)
 
-    # Find best result for each stock
-    stock_best = {}
-    for result in valid_results:
-        ticker = result["ticker"]
-        if ticker not in stock_best or result["total_return"] > stock_best[ticker]["total_return"]:
-            stock_best[ticker] = result
+    # Best result for each stock (first mode wins ties), in benchmark order
+    stock_best = df.loc[df.groupby('ticker', sort=False)['total_return'].idxmax()]
 
-    # Sort by return
-    top_stocks = sorted(stock_best.values(), key=lambda x: x["total_return"], reverse=True)[:10]
+    # Sort by return (stable, so ties keep benchmark order)
+    top_stocks = stock_best.sort_values('total_return', ascending=False, kind='stable').head(10)
 
-    for i, stock in enumerate(top_stocks, 1):
-        print(f"{i:2d}. {stock['ticker']:10s} {stock['total_return']:+7.2f}% "
-              f"({stock['mode']:12s}) - {stock['total_trades']:3d} trades, "
-              f"{stock['win_rate']:5.1f}% win rate")
+    for i, stock in enumerate(top_stocks.itertuples(index=False), 1):
+        print(f"{i:2d}. {stock.ticker:10s} {stock.total_return:+7.2f}% "
+              f"({stock.mode:12s}) - {stock.total_trades:3d} trades, "
+              f"{stock.win_rate:5.1f}% win rate")
 
     # 3. Worst 5 Stocks
     print("\n\n3. WORST 5 STOCKS")
     print("-" * 80)
 
-    worst_stocks = sorted(stock_best.values(), key=lambda x: x["total_return"])[:5]
+    worst_stocks = stock_best.sort_values('total_return', kind='stable').head(5)
 
-    for i, stock in enumerate(worst_stocks, 1):
-        print(f"{i}. {stock['ticker']:10s} {stock['total_return']:+7.2f}% "
-              f"({stock['mode']:12s}) - {stock['total_trades']:3d} trades")
+    for i, stock in enumerate(worst_stocks.itertuples(index=False), 1):
+        print(f"{i}. {stock.ticker:10s} {stock.total_return:+7.2f}% "
+              f"({stock.mode:12s}) - {stock.total_trades:3d} trades")
 
     # 4. Mode-specific winners
     print("\n\n4. BEST STOCKS PER MODE")
     print("-" * 80)
 
-    for mode in MODES:
-        mode_results = [r for r in valid_results if r["mode"] == mode]
-        if mode_results:
-            best_for_mode = max(mode_results, key=lambda x: x["total_return"])
-            print(f"\n{mode.upper()}")
-            print(f"  Best: {best_for_mode['ticker']} ({best_for_mode['total_return']:+.2f}%)")
-            print(f"  Trades: {best_for_mode['total_trades']}, Win Rate: {best_for_mode['win_rate']:.1f}%")
+    mode_best = df.loc[by_mode['total_return'].idxmax()].set_index('mode')
+    for mode in tested_modes:
+        best_for_mode = mode_best.loc[mode]
+        print(f"\n{mode.upper()}")
+        print(f"  Best: {best_for_mode['ticker']} ({best_for_mode['total_return']:+.2f}%)")
+        print(f"  Trades: {best_for_mode['total_trades']}, Win Rate: {best_for_mode['win_rate']:.1f}%")
 
     # 5. Trading Activity
     print("\n\n5. TRADING ACTIVITY")
     print("-" * 80)
 
-    for mode in MODES:
-        mode_results = [r for r in valid_results if r["mode"] == mode]
-        if mode_results:
-            total_trades = sum(r["total_trades"] for r in mode_results)
-            avg_trades_per_stock = total_trades / len(mode_results)
-            print(f"{mode:12s}: {total_trades:4d} total trades ({avg_trades_per_stock:.1f} avg per stock)")
+    mode_trades = by_mode['total_trades'].sum()
+    for mode in tested_modes:
+        total_trades = mode_trades[mode]
+        avg_trades_per_stock = total_trades / mode_counts[mode]
+        print(f"{mode:12s}: {total_trades:4d} total trades ({avg_trades_per_stock:.1f} avg per stock)")
 
     print("\n")
     print("=" * 80)
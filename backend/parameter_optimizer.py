@@ -6,10 +6,19 @@ Tests different combinations of stop loss, targets, thresholds, etc.
 
 import json
 import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from backtester import Backtester
 import numpy as np
 
+# Optuna is optional - enables the TPE search in run_bayesian_optimization
+try:
+    import optuna
+except ImportError:
+    optuna = None
+
 # Test stocks (top performers from benchmark)
 TEST_STOCKS = [
     "ERIC-B",  # Best performer
@@ -63,6 +72,155 @@ def create_test_config(stop_loss, target_mult, min_score, tech_weight, macro_wei
     }
 
 
+# Early stopping in run_optimization: after PRUNE_MIN_STOCKS stocks, a config whose
+# running average is below the PRUNE_PERCENTILE of completed configs skips the rest
+PRUNE_MIN_STOCKS = 3
+PRUNE_MIN_COMPLETED = 20
+PRUNE_PERCENTILE = 25
+
+
+# Per-stock result key optimized for each target metric
+METRIC_KEYS = {
+    "sharpe": "sharpe",
+    "return": "return",
+    "win_rate": "win_rate",
+    "profit_factor": "profit_factor",
+}
+
+
+# Per-ticker OHLCV loaded once per optimization run (see _prefetch_price_data)
+_PRICE_CACHE = {}
+
+
+def _prefetch_price_data():
+    """Load each test stock's history once, shared by every trial instead of re-read per backtest"""
+    _PRICE_CACHE.clear()
+    for ticker in TEST_STOCKS:
+        bt = Backtester(ticker=ticker, market='SE', start_date=START_DATE, end_date=END_DATE)
+        data = bt.fetch_price_data()
+        if data is not None and not data.empty:
+            _PRICE_CACHE[ticker] = data
+    return _PRICE_CACHE
+
+
+def _init_worker(price_cache):
+    """Process pool initializer - ship the prefetched histories to each worker once"""
+    _PRICE_CACHE.update(price_cache)
+
+
+def _run_single_backtest(args):
+    """Run one (ticker, config) backtest and return its stock result (module-level so it pickles)"""
+    ticker, config, start_date, end_date, initial_capital = args
+
+    # Create custom backtester with test parameters
+    bt = Backtester(
+        ticker=ticker,
+        market='SE',
+        start_date=start_date,
+        end_date=end_date,
+        initial_capital=initial_capital,
+        mode='conservative',  # Use conservative as base
+        price_data=_PRICE_CACHE.get(ticker)
+    )
+
+    # Override mode config with test parameters
+    bt.mode_config = config
+
+    # Run backtest
+    metrics = bt.run()['metrics']
+
+    return {
+        "ticker": ticker,
+        "return": metrics.get("total_return", 0),
+        "sharpe": metrics.get("sharpe_ratio", 0),
+        "win_rate": metrics.get("win_rate", 0),
+        "trades": metrics.get("total_trades", 0),
+        "profit_factor": metrics.get("profit_factor", 0),
+        "max_drawdown": metrics.get("max_drawdown", 0),
+    }
+
+
+def _iter_backtests(jobs, skip=None):
+    """
+    Run backtest jobs on all cores
+
+    Jobs are submitted in order with a bounded number in flight, so a job is
+    only dispatched once the pool has room - by then `skip` can already
+    reject it (e.g. its config was pruned early).
+
+    Args:
+        jobs: List of _run_single_backtest argument tuples
+        skip: Optional predicate on the job index, checked just before dispatch
+
+    Yields:
+        (job index, stock result, the raised exception, or None if skipped)
+        as each backtest completes. If the process pool breaks, the
+        unfinished jobs run sequentially in this process instead.
+    """
+    skip = skip or (lambda index: False)
+    max_workers = os.cpu_count() or 1
+    done = set()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(_PRICE_CACHE,)) as executor:
+            pending_jobs = iter(range(len(jobs)))
+            futures = {}
+
+            while True:
+                # Keep the pool fed; skipped jobs are reported without running
+                for index in pending_jobs:
+                    if skip(index):
+                        done.add(index)
+                        yield index, None
+                        continue
+                    futures[executor.submit(_run_single_backtest, jobs[index])] = index
+                    if len(futures) >= 2 * max_workers:
+                        break
+
+                if not futures:
+                    break
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = futures.pop(future)
+                    try:
+                        outcome = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        outcome = e
+                    done.add(index)
+                    yield index, outcome
+
+    except BrokenProcessPool:
+        print(f"Process pool broke - running {len(jobs) - len(done)} remaining backtests sequentially")
+        for index, job in enumerate(jobs):
+            if index in done:
+                continue
+            if skip(index):
+                yield index, None
+                continue
+            try:
+                outcome = _run_single_backtest(job)
+            except Exception as e:
+                outcome = e
+            yield index, outcome
+
+
+def _aggregate_results(config, stock_results):
+    """Average one configuration's per-stock metrics"""
+    return {
+        "config": config,
+        "avg_return": np.mean([r["return"] for r in stock_results]),
+        "avg_sharpe": np.mean([r["sharpe"] for r in stock_results]),
+        "avg_win_rate": np.mean([r["win_rate"] for r in stock_results]),
+        "avg_profit_factor": np.mean([r["profit_factor"] for r in stock_results]),
+        "avg_drawdown": np.mean([r["max_drawdown"] for r in stock_results]),
+        "total_trades": sum([r["trades"] for r in stock_results]),
+        "stock_results": stock_results
+    }
+
+
 def run_optimization(max_tests=100, target_metric="sharpe"):
     """
     Run parameter optimization
@@ -103,81 +261,207 @@ def run_optimization(max_tests=100, target_metric="sharpe"):
 
     print()
 
+    configs = [
+        create_test_config(stop_loss, target_mult, min_score, tech_w, macro_w)
+        for stop_loss, target_mult, min_score, (tech_w, macro_w) in test_combinations
+    ]
+
+    _prefetch_price_data()
+
+    # Every (config, ticker) backtest is independent - dispatch them all to the pool
+    metric_key = METRIC_KEYS[target_metric]
+    n_stocks = len(TEST_STOCKS)
+    jobs = [
+        (ticker, config, START_DATE, END_DATE, INITIAL_CAPITAL)
+        for config in configs
+        for ticker in TEST_STOCKS
+    ]
+    total_tests = len(jobs)
+    stock_slots = [[None] * n_stocks for _ in configs]
+    remaining = [n_stocks] * len(configs)
+    results_by_config = {}
+    completed_scores = []  # Target-metric averages of fully tested configs
+    pruned = set()
+
+    def is_pruned(index):
+        return index // n_stocks in pruned
+
+    for current_test, (index, outcome) in enumerate(_iter_backtests(jobs, skip=is_pruned), 1):
+        config_id, stock_pos = divmod(index, n_stocks)
+        progress = (current_test / total_tests) * 100
+        remaining[config_id] -= 1
+
+        if config_id in pruned:
+            continue
+
+        if isinstance(outcome, Exception):
+            print(f"[{progress:5.1f}%] {TEST_STOCKS[stock_pos]} - ERROR: {str(outcome)[:30]}")
+        else:
+            stock_slots[config_id][stock_pos] = outcome
+
+        stock_results = [r for r in stock_slots[config_id] if r is not None]
+
+        if remaining[config_id]:
+            # Stop a config early once it trails most of the completed ones
+            if (len(stock_results) >= PRUNE_MIN_STOCKS
+                    and len(completed_scores) >= PRUNE_MIN_COMPLETED
+                    and np.mean([r[metric_key] for r in stock_results])
+                    < np.percentile(completed_scores, PRUNE_PERCENTILE)):
+                pruned.add(config_id)
+            continue
+
+        # All stocks for this config are done - aggregate in TEST_STOCKS order
+        if stock_results:
+            config = configs[config_id]
+            result = _aggregate_results(config, stock_results)
+            results_by_config[config_id] = result
+            completed_scores.append(np.mean([r[metric_key] for r in stock_results]))
+
+            # Print progress (completion order)
+            _print_result(progress, result)
+
+    if pruned:
+        print(f"\nStopped {len(pruned)} of {len(configs)} configurations early (below "
+              f"{PRUNE_PERCENTILE}th percentile after {PRUNE_MIN_STOCKS}+ stocks)")
+
+    # Keep results in sampled-combination order regardless of completion order
+    results = [results_by_config[config_id] for config_id in sorted(results_by_config)]
+
+    _save_results(results, target_metric)
+
+    # Analyze results
+    analyze_results(results, target_metric)
+
+    return results
+
+
+def run_bayesian_optimization(max_tests=100, target_metric="sharpe"):
+    """
+    Run parameter optimization with Optuna's TPE sampler
+
+    Samples the same PARAM_GRID as run_optimization, but concentrates trials
+    on promising regions instead of sampling uniformly. Trials are asked in
+    batches of one per core and their per-stock backtests share the process
+    pool. Each finished stock reports the trial's running average of the
+    target metric, so the Hyperband pruner stops weak configurations after a
+    few stocks instead of all of them.
+
+    Args:
+        max_tests: Number of Optuna trials
+        target_metric: Metric to optimize ('sharpe', 'return', 'win_rate', 'profit_factor')
+    """
+    if optuna is None:
+        raise ImportError("optuna is required for run_bayesian_optimization (pip install optuna)")
+
+    metric_key = METRIC_KEYS[target_metric]
+
+    print("=" * 80)
+    print("PARAMETER OPTIMIZATION (Optuna TPE)")
+    print("=" * 80)
+    print(f"Test Stocks: {', '.join(TEST_STOCKS)}")
+    print(f"Period: {START_DATE} to {END_DATE}")
+    print(f"Target Metric: {target_metric}")
+    print(f"Max Trials: {max_tests}")
+    print("=" * 80)
+    print()
+
+    _prefetch_price_data()
     results = []
-    total_tests = len(test_combinations) * len(TEST_STOCKS)
-    current_test = 0
 
-    # Test each combination
-    for stop_loss, target_mult, min_score, (tech_w, macro_w) in test_combinations:
+    def suggest_config(trial):
+        tech_w, macro_w = PARAM_GRID["weights"][trial.suggest_int("weights", 0, len(PARAM_GRID["weights"]) - 1)]
+        return create_test_config(
+            trial.suggest_categorical("stop_loss", PARAM_GRID["stop_loss"]),
+            trial.suggest_categorical("target_multiplier", PARAM_GRID["target_multiplier"]),
+            trial.suggest_categorical("min_score", PARAM_GRID["min_score"]),
+            tech_w,
+            macro_w,
+        )
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(
+        direction="maximize",
+        sampler=optuna.samplers.TPESampler(seed=42),
+        pruner=optuna.pruners.HyperbandPruner(min_resource=1, max_resource=len(TEST_STOCKS)),
+    )
+
+    # Ask/tell in batches: TPE proposes a batch from the finished trials, then
+    # all of the batch's backtests run together on the pool
+    n_stocks = len(TEST_STOCKS)
+    batch_size = os.cpu_count() or 1
+    n_trials = 0
+    while n_trials < max_tests:
+        trials = [study.ask() for _ in range(min(batch_size, max_tests - n_trials))]
+        n_trials += len(trials)
+        configs = [suggest_config(trial) for trial in trials]
+        jobs = [
+            (ticker, config, START_DATE, END_DATE, INITIAL_CAPITAL)
+            for config in configs
+            for ticker in TEST_STOCKS
+        ]
+        stock_slots = [[None] * n_stocks for _ in trials]
+        pruned = set()
+
+        def is_pruned(index):
+            return index // n_stocks in pruned
+
+        for index, outcome in _iter_backtests(jobs, skip=is_pruned):
+            trial_pos, stock_pos = divmod(index, n_stocks)
+            trial = trials[trial_pos]
+            if trial_pos in pruned or outcome is None:
+                continue
 
-        config = create_test_config(stop_loss, target_mult, min_score, tech_w, macro_w)
+            if isinstance(outcome, Exception):
+                print(f"[trial {trial.number}] {TEST_STOCKS[stock_pos]} - ERROR: {str(outcome)[:30]}")
+                continue
 
-        # Test on all stocks
-        stock_results = []
+            stock_slots[trial_pos][stock_pos] = outcome
+            stock_results = [r for r in stock_slots[trial_pos] if r is not None]
 
-        for ticker in TEST_STOCKS:
-            current_test += 1
-            progress = (current_test / total_tests) * 100
+            # Step = stocks tested so far (completion order within the trial)
+            step = len(stock_results) - 1
+            trial.report(np.mean([r[metric_key] for r in stock_results]), step)
+            if step < n_stocks - 1 and trial.should_prune():
+                print(f"[trial {trial.number}] pruned after {step + 1} stocks")
+                pruned.add(trial_pos)
 
-            try:
-                # Create custom backtester with test parameters
-                bt = Backtester(
-                    ticker=ticker,
-                    market='SE',
-                    start_date=START_DATE,
-                    end_date=END_DATE,
-                    initial_capital=INITIAL_CAPITAL,
-                    mode='conservative'  # Use conservative as base
-                )
-
-                # Override mode config with test parameters
-                bt.mode_config = config
-
-                # Run backtest
-                result = bt.run()
-                metrics = result['metrics']
-
-                stock_results.append({
-                    "ticker": ticker,
-                    "return": metrics.get("total_return", 0),
-                    "sharpe": metrics.get("sharpe_ratio", 0),
-                    "win_rate": metrics.get("win_rate", 0),
-                    "trades": metrics.get("total_trades", 0),
-                    "profit_factor": metrics.get("profit_factor", 0),
-                    "max_drawdown": metrics.get("max_drawdown", 0),
-                })
+        for trial_pos, (trial, config) in enumerate(zip(trials, configs)):
+            if trial_pos in pruned:
+                study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+                continue
 
-            except Exception as e:
-                print(f"[{progress:5.1f}%] {ticker} - ERROR: {str(e)[:30]}")
+            # Aggregate in TEST_STOCKS order regardless of completion order
+            stock_results = [r for r in stock_slots[trial_pos] if r is not None]
+            if not stock_results:
+                study.tell(trial, state=optuna.trial.TrialState.FAIL)
                 continue
 
-        # Calculate aggregate metrics
-        if stock_results:
-            avg_return = np.mean([r["return"] for r in stock_results])
-            avg_sharpe = np.mean([r["sharpe"] for r in stock_results])
-            avg_win_rate = np.mean([r["win_rate"] for r in stock_results])
-            avg_profit_factor = np.mean([r["profit_factor"] for r in stock_results])
-            avg_drawdown = np.mean([r["max_drawdown"] for r in stock_results])
-            total_trades = sum([r["trades"] for r in stock_results])
-
-            results.append({
-                "config": config,
-                "avg_return": avg_return,
-                "avg_sharpe": avg_sharpe,
-                "avg_win_rate": avg_win_rate,
-                "avg_profit_factor": avg_profit_factor,
-                "avg_drawdown": avg_drawdown,
-                "total_trades": total_trades,
-                "stock_results": stock_results
-            })
-
-            # Print progress
-            print(f"[{progress:5.1f}%] SL={stop_loss*100:.1f}%, Tgt={target_mult:.1f}x, "
-                  f"Score={min_score:.1f}, W={tech_w:.0%}/{macro_w:.0%} "
-                  f"-> Return={avg_return:+.1f}%, Sharpe={avg_sharpe:.2f}, "
-                  f"Win={avg_win_rate:.0f}%")
-
-    # Save all results
+            result = _aggregate_results(config, stock_results)
+            results.append(result)
+            _print_result((trial.number + 1) / max_tests * 100, result)
+            study.tell(trial, np.mean([r[metric_key] for r in stock_results]))
+
+    _save_results(results, target_metric)
+
+    # Analyze results
+    analyze_results(results, target_metric)
+
+    return results
+
+
+def _print_result(progress, result):
+    """Print one configuration's aggregate performance"""
+    config = result["config"]
+    print(f"[{progress:5.1f}%] SL={config['stop_loss_buffer']*100:.1f}%, "
+          f"Tgt={config['target_multiplier']:.1f}x, "
+          f"Score={config['buy_threshold']:.1f}, "
+          f"W={config['tech_weight']:.0%}/{config['macro_weight']:.0%} "
+          f"-> Return={result['avg_return']:+.1f}%, Sharpe={result['avg_sharpe']:.2f}, "
+          f"Win={result['avg_win_rate']:.0f}%")
+
+
+def _save_results(results, target_metric):
+    """Save all configuration results to disk"""
     output_file = "parameter_optimization_results.json"
     with open(output_file, 'w') as f:
         json.dump({
@@ -193,11 +477,6 @@ def run_optimization(max_tests=100, target_metric="sharpe"):
 
     print(f"\n\nResults saved to: {output_file}")
 
-    # Analyze results
-    analyze_results(results, target_metric)
-
-    return results
-
 
 def analyze_results(results, target_metric="sharpe"):
     """Analyze optimization results and find best parameters"""
@@ -298,7 +577,10 @@ def analyze_results(results, target_metric="sharpe"):
 
 
 if __name__ == "__main__":
-    # Run optimization (testing 100 random combinations)
+    # Run optimization (100 TPE trials with Optuna, else 100 random combinations)
     # Can adjust max_tests for faster/slower but more/less thorough search
-    results = run_optimization(max_tests=100, target_metric="sharpe")
+    if optuna is not None:
+        results = run_bayesian_optimization(max_tests=100, target_metric="sharpe")
+    else:
+        results = run_optimization(max_tests=100, target_metric="sharpe")
     print("\nOptimization complete!")
@@ -5,10 +5,12 @@ Calculates position sizes based on relative ranking (percentiles) instead of abs
 
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from itertools import chain
 import numpy as np
 import pandas as pd
 import json
 import os
+from _percentile_jit import _batch_percentile, _percentile
 
 
 class PercentileSizer:
@@ -28,6 +30,16 @@ class PercentileSizer:
         self.history_file = 'percentile_history.json'
         self.score_history = self._load_history()
 
+    @property
+    def score_history(self) -> Dict:
+        """Daily score history: {'YYYY-MM-DD': {'scores': [...], 'mean': ..., ...}}"""
+        return self._score_history
+
+    @score_history.setter
+    def score_history(self, history: Dict):
+        self._score_history = history
+        self._window_index = None  # Rebuilt lazily on the next window lookup
+
     def _load_history(self) -> Dict:
         """Load historical scores from disk"""
         if os.path.exists(self.history_file):
@@ -70,6 +82,7 @@ class PercentileSizer:
             'std': float(np.std(score_values)),
             'count': len(score_values)
         }
+        self._window_index = None
 
         # Trim history to window_days + buffer
         self._trim_history(keep_days=self.window_days + 60)  # Keep 60 extra days for safety
@@ -88,6 +101,7 @@ class PercentileSizer:
         for date_str in dates:
             if date_str < cutoff_date:
                 del self.score_history[date_str]
+                self._window_index = None
 
     def get_percentile(self, score: float, date: datetime = None) -> float:
         """
@@ -112,9 +126,31 @@ class PercentileSizer:
             return min(100, max(0, (score / 10) * 100))
 
         # Calculate percentile
-        percentile = (np.sum(window_scores < score) / len(window_scores)) * 100
+        return _percentile(window_scores, float(score))
+
+    def get_percentiles_batch(self, scores: np.ndarray, date: datetime = None) -> np.ndarray:
+        """
+        Calculate percentiles for many scores against the same rolling window
+        (e.g. a whole OMX30 scan), looking the window up only once
+
+        Args:
+            scores: Array of technical scores
+            date: Date to calculate percentiles for (default: today)
+
+        Returns:
+            Array of percentiles (0-100), same order as scores
+        """
+        if date is None:
+            date = datetime.now()
+
+        scores = np.asarray(scores, dtype=float)
+        window_scores = self._get_window_scores(date)
+
+        if len(window_scores) < 10:  # Need minimum data
+            # Same absolute fallback as get_percentile
+            return np.clip(scores / 10 * 100, 0, 100)
 
-        return percentile
+        return _batch_percentile(window_scores, scores)
 
     def _get_window_scores(self, end_date: datetime) -> np.ndarray:
         """
@@ -126,15 +162,38 @@ class PercentileSizer:
         Returns:
             Array of all scores in window
         """
+        if self._window_index is None:
+            self._window_index = self._build_window_index()
+        day_ordinals, offsets, flat_scores = self._window_index
+
+        # History days are midnights: a window starting mid-day excludes that day
         start_date = end_date - timedelta(days=self.window_days)
+        start_ord = start_date.toordinal()
+        if start_date > datetime.fromordinal(start_ord):
+            start_ord += 1
+
+        i0 = np.searchsorted(day_ordinals, start_ord, 'left')
+        i1 = np.searchsorted(day_ordinals, end_date.toordinal(), 'right')
+        return flat_scores[offsets[i0]:offsets[i1]]
 
-        all_scores = []
-        for date_str, data in self.score_history.items():
-            date = datetime.strptime(date_str, '%Y-%m-%d')
-            if start_date <= date <= end_date:
-                all_scores.extend(data['scores'])
+    def _build_window_index(self):
+        """
+        Array index over the history for window lookups (CSR layout)
 
-        return np.array(all_scores)
+        Returns:
+            (sorted day ordinals, per-day start offsets into the flat scores
+            with a trailing end offset, all scores flattened in date order)
+        """
+        dates = sorted(self.score_history)
+        day_ordinals = np.array([datetime.strptime(d, '%Y-%m-%d').toordinal() for d in dates], dtype=np.int64)
+        counts = [len(self.score_history[d]['scores']) for d in dates]
+        offsets = np.zeros(len(dates) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        flat_scores = np.fromiter(
+            chain.from_iterable(self.score_history[d]['scores'] for d in dates),
+            dtype=float, count=int(offsets[-1])
+        )
+        return day_ordinals, offsets, flat_scores
 
     def calculate_position_size(self, score: float, date: datetime = None,
                                  min_size: str = None) -> str:
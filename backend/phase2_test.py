@@ -3,9 +3,11 @@ Phase 2 Enhancement Test
 Quick benchmark to validate volume + ADX improvements on top 5 stocks
 """
 
+import logging
 from backtester import Backtester
 import json
 from datetime import datetime
+from statistics import fmean
 
 # Top 5 performers from OMX30 benchmark
 TEST_STOCKS = ["ERIC-B", "ABB", "SAND", "BOL", "EVO"]
@@ -119,10 +121,10 @@ def analyze_results(results):
         mode_results = [r for r in valid_results if r["mode"] == mode]
 
         if mode_results:
-            avg_return = sum(r["total_return"] for r in mode_results) / len(mode_results)
-            avg_win_rate = sum(r["win_rate"] for r in mode_results) / len(mode_results)
-            avg_trades = sum(r["total_trades"] for r in mode_results) / len(mode_results)
-            avg_sharpe = sum(r["sharpe_ratio"] for r in mode_results) / len(mode_results)
+            avg_return = fmean(r["total_return"] for r in mode_results)
+            avg_win_rate = fmean(r["win_rate"] for r in mode_results)
+            avg_trades = fmean(r["total_trades"] for r in mode_results)
+            avg_sharpe = fmean(r["sharpe_ratio"] for r in mode_results)
 
             print(f"\n{mode.upper()} MODE (Phase 2 Enhanced)")
             print(f"  Avg Return:    {avg_return:+7.2f}%")
@@ -144,8 +146,8 @@ def analyze_results(results):
         mode_results = [r for r in valid_results if r["mode"] == mode]
 
         if mode_results:
-            avg_return = sum(r["total_return"] for r in mode_results) / len(mode_results)
-            avg_win_rate = sum(r["win_rate"] for r in mode_results) / len(mode_results)
+            avg_return = fmean(r["total_return"] for r in mode_results)
+            avg_win_rate = fmean(r["win_rate"] for r in mode_results)
 
             baseline_return = baseline[mode]["return"]
             baseline_win_rate = baseline[mode]["win_rate"]
@@ -180,5 +182,8 @@ def analyze_results(results):
 
 
 if __name__ == "__main__":
+    # Show per-trade ENTRY/EXIT lines from the backtester
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     results = run_phase2_test()
     print("\nPhase 2 test complete!")
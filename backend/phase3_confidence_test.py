@@ -3,6 +3,7 @@ Phase 3: Confidence System Backtest
 Tests confidence-based position sizing with MarketMate risk adjustments
 """
 
+import logging
 from backtester import Backtester
 import json
 from datetime import datetime
@@ -198,4 +199,7 @@ def test_confidence_backtest():
     print("\n" + "=" * 80)
 
 if __name__ == "__main__":
+    # Show per-trade ENTRY/EXIT lines from the backtester
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     test_confidence_backtest()
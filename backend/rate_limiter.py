@@ -0,0 +1,40 @@
+"""
+Rate Limiter
+Token bucket for att strypa anrop mot externa API:er (Yahoo Finance)
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Tradsaker token bucket
+
+    Tillater korta bursts upp till `capacity` anrop och fyller sedan pa
+    med `rate` tokens per sekund. acquire() sover bara nar hinken ar tom.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def acquire(self):
+        """Ta en token, vanta om hinken ar tom"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
@@ -5,8 +5,14 @@ Hamtar aktiekurser, historisk data och tekniska indikatorer
 
 import yfinance as yf
 import pandas as pd
+import requests
+import threading
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import TokenBucket
 
 # Import metadata cache for fast search
 try:
@@ -19,6 +25,31 @@ except ImportError:
 # Import Swedish tickers
 from tickers import SWEDISH_TICKERS
 
+# Gemensam throttle for alla Yahoo-anrop i processen (5 req/s, burst 5)
+YAHOO_RATE_LIMITER = TokenBucket(rate=5.0, capacity=5)
+
+
+def create_yf_session():
+    """
+    Skapar en HTTP-session med keep-alive att dela mellan alla yf.Ticker-anrop
+
+    Nyare yfinance kor pa curl_cffi - anvand den om den finns, annars en
+    requests.Session med en storre connection pool.
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+# En session per process - TCP/TLS-handskakningen gors bara en gang
+YAHOO_SESSION = create_yf_session()
+
 class StockDataFetcher:
     """Hamtar och hanterar aktiedata fran Yahoo Finance"""
 
@@ -31,6 +62,11 @@ class StockDataFetcher:
 
     def __init__(self):
         self.cache = {}  # Cache for att minska API-anrop
+        self.session = YAHOO_SESSION  # Delad keep-alive session mot Yahoo
+
+        # Pagaende Yahoo-anrop - samtidiga identiska anrop delar ett svar
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
 
         # Initialize metadata cache for fast search (no API calls)
         if StockMetadataCache:
@@ -62,6 +98,49 @@ class StockDataFetcher:
                 return f"{ticker}{self.SWEDISH_SUFFIX}"
         return ticker
 
+    def _coalesced(self, key: str, fetch: Callable):
+        """
+        Kor fetch() via rate limitern, men bara en gang per nyckel at gangen
+
+        Om ett identiskt anrop redan pagar vantar vi pa dess resultat
+        istallet for att skicka ett nytt anrop till Yahoo.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            YAHOO_RATE_LIMITER.acquire()
+            result = fetch()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _fetch_history(self, symbol: str, period: str, timeout: float = 10) -> pd.DataFrame:
+        """Throttlad och coalescad yf.Ticker(symbol).history(period)"""
+        return self._coalesced(
+            f"history:{symbol}:{period}",
+            lambda: yf.Ticker(symbol, session=self.session).history(period=period, timeout=timeout)
+        )
+
+    def _fetch_info(self, symbol: str) -> Dict:
+        """Throttlad och coalescad yf.Ticker(symbol).info"""
+        return self._coalesced(
+            f"info:{symbol}",
+            lambda: yf.Ticker(symbol, session=self.session).info
+        )
+
     def get_current_price(self, ticker: str, market: str = "SE") -> Optional[float]:
         """
         Hamtar nuvarande pris for aktie
@@ -75,18 +154,18 @@ class StockDataFetcher:
         """
         try:
             symbol = self.get_ticker_symbol(ticker, market)
-            stock = yf.Ticker(symbol)
 
             # Forst prova att hamta fran info
             try:
-                price = stock.info.get('currentPrice') or stock.info.get('regularMarketPrice')
+                info = self._fetch_info(symbol)
+                price = info.get('currentPrice') or info.get('regularMarketPrice')
                 if price:
                     return float(price)
             except:
                 pass
 
             # Fallback: hamta senaste close-pris
-            hist = stock.history(period="1d")
+            hist = self._fetch_history(symbol, "1d")
             if not hist.empty:
                 return float(hist['Close'].iloc[-1])
 
@@ -97,7 +176,7 @@ class StockDataFetcher:
             return None
 
     def get_historical_data(self, ticker: str, period: str = "3mo",
-                           market: str = "SE") -> pd.DataFrame:
+                           market: str = "SE", timeout: float = 10) -> pd.DataFrame:
         """
         Hamtar historisk prisdata
 
@@ -105,14 +184,14 @@ class StockDataFetcher:
             ticker: Aktiesymbol
             period: Tidsperiod (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, max)
             market: Marknad (SE/US)
+            timeout: Timeout per Yahoo-anrop i sekunder (yfinance default 10)
 
         Returns:
             DataFrame med OHLCV data
         """
         try:
             symbol = self.get_ticker_symbol(ticker, market)
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period)
+            data = self._fetch_history(symbol, period, timeout=timeout)
 
             if data.empty:
                 print(f"Ingen data for {ticker}")
@@ -124,6 +203,56 @@ class StockDataFetcher:
             print(f"Fel vid hamtning av historisk data for {ticker}: {e}")
             return pd.DataFrame()
 
+    def get_historical_data_batch(self, tickers: List[str], period: str = "3mo",
+                                  market: str = "SE", timeout: float = 10) -> Dict[str, pd.DataFrame]:
+        """
+        Hamtar historisk prisdata for flera aktier i ett batch-anrop (yf.download)
+
+        Args:
+            tickers: Lista med aktiesymboler
+            period: Tidsperiod (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, max)
+            market: Marknad (SE/US)
+            timeout: Timeout for anropet i sekunder
+
+        Returns:
+            Dict med ticker: OHLCV DataFrame (aktier utan data utelamnas)
+        """
+        symbols = {self.get_ticker_symbol(t, market): t for t in tickers}
+
+        try:
+            raw = self._coalesced(
+                f"history_batch:{','.join(symbols)}:{period}",
+                lambda: yf.download(
+                    list(symbols),
+                    period=period,
+                    group_by='ticker',
+                    auto_adjust=True,
+                    threads=True,
+                    progress=False,
+                    timeout=timeout,
+                    session=self.session
+                )
+            )
+        except Exception as e:
+            print(f"Fel vid batch-hamtning av historisk data: {e}")
+            return {}
+
+        if raw is None or raw.empty:
+            return {}
+
+        frames = {}
+        if isinstance(raw.columns, pd.MultiIndex):
+            available = set(raw.columns.get_level_values(0))
+            for symbol, ticker in symbols.items():
+                if symbol in available:
+                    frame = raw[symbol].dropna(how='all')
+                    if not frame.empty:
+                        frames[ticker] = frame
+        elif len(symbols) == 1:
+            frames[tickers[0]] = raw.dropna(how='all')
+
+        return frames
+
     def get_stock_info(self, ticker: str, market: str = "SE") -> Dict:
         """
         Hamtar grundlaggande info om aktie
@@ -133,8 +262,7 @@ class StockDataFetcher:
         """
         try:
             symbol = self.get_ticker_symbol(ticker, market)
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            info = self._fetch_info(symbol)
 
             return {
                 'ticker': ticker,
@@ -163,11 +291,10 @@ class StockDataFetcher:
         """
         try:
             symbol = self.get_ticker_symbol(ticker, market)
-            stock = yf.Ticker(symbol)
 
             # Hamta fran info
             try:
-                info = stock.info
+                info = self._fetch_info(symbol)
                 price = info.get('currentPrice') or info.get('regularMarketPrice')
 
                 if price:
@@ -184,7 +311,7 @@ class StockDataFetcher:
                 print(f"Error getting info for {ticker}: {e}")
 
             # Fallback: hamta senaste 2 dagar och berakna change
-            hist = stock.history(period="2d")
+            hist = self._fetch_history(symbol, "2d")
             if not hist.empty and len(hist) >= 2:
                 current_price = float(hist['Close'].iloc[-1])
                 previous_price = float(hist['Close'].iloc[-2])
@@ -347,8 +474,7 @@ class StockDataFetcher:
         if len(results) < limit:
             try:
                 # Prova som US ticker
-                stock = yf.Ticker(query_upper)
-                info = stock.info
+                info = self._fetch_info(query_upper)
                 if info and info.get('regularMarketPrice'):
                     results.append({
                         'ticker': query_upper,
@@ -7,6 +7,13 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Tuple, Optional
 
+
+def _last(series: pd.Series) -> Optional[float]:
+    """Sista vardet som float, None om NaN (positionsindex via numpy, inte .iloc)"""
+    value = series.to_numpy()[-1]
+    return None if pd.isna(value) else float(value)
+
+
 class TechnicalAnalyzer:
     """Beraknar tekniska indikatorer"""
 
@@ -104,8 +111,26 @@ class TechnicalAnalyzer:
         Returns:
             Tuple (upper_band, middle_band, lower_band)
         """
-        middle_band = data['Close'].rolling(window=period).mean()
-        std = data['Close'].rolling(window=period).std()
+        close = data['Close'].to_numpy(dtype=np.float64)
+
+        # NaN i serien skulle forgifta cumsum - lat pandas hantera det fallet
+        if len(close) < period or period < 2 or np.isnan(close).any():
+            middle_band = data['Close'].rolling(window=period).mean()
+            std = data['Close'].rolling(window=period).std()
+        else:
+            # Rullande summa och kvadratsumma via cumsum: O(N) istallet for O(N*W)
+            c1 = np.concatenate(([0.0], np.cumsum(close)))
+            c2 = np.concatenate(([0.0], np.cumsum(close * close)))
+            win_sum = c1[period:] - c1[:-period]
+            win_sq = c2[period:] - c2[:-period]
+
+            mean = win_sum / period
+            # Sample-varians (ddof=1) som pandas rolling().std()
+            var = np.maximum((win_sq - win_sum * mean) / (period - 1), 0.0)
+
+            pad = np.full(period - 1, np.nan)
+            middle_band = pd.Series(np.concatenate((pad, mean)), index=data.index)
+            std = pd.Series(np.concatenate((pad, np.sqrt(var))), index=data.index)
 
         upper_band = middle_band + (std_dev * std)
         lower_band = middle_band - (std_dev * std)
@@ -250,15 +275,16 @@ class TechnicalAnalyzer:
         adx, plus_di, minus_di = self.calculate_adx(data)
 
         # Senaste varden
-        current_price = float(data['Close'].iloc[-1])
-        current_rsi = float(rsi.iloc[-1]) if not pd.isna(rsi.iloc[-1]) else None
-        current_macd = float(macd_line.iloc[-1]) if not pd.isna(macd_line.iloc[-1]) else None
-        current_signal = float(signal_line.iloc[-1]) if not pd.isna(signal_line.iloc[-1]) else None
-        current_k = float(k_percent.iloc[-1]) if not pd.isna(k_percent.iloc[-1]) else None
-        current_d = float(d_percent.iloc[-1]) if not pd.isna(d_percent.iloc[-1]) else None
-        current_adx = float(adx.iloc[-1]) if not pd.isna(adx.iloc[-1]) else None
-        current_plus_di = float(plus_di.iloc[-1]) if not pd.isna(plus_di.iloc[-1]) else None
-        current_minus_di = float(minus_di.iloc[-1]) if not pd.isna(minus_di.iloc[-1]) else None
+        current_price = float(data['Close'].to_numpy()[-1])
+        current_rsi = _last(rsi)
+        current_macd = _last(macd_line)
+        current_signal = _last(signal_line)
+        current_k = _last(k_percent)
+        current_d = _last(d_percent)
+        current_adx = _last(adx)
+        current_plus_di = _last(plus_di)
+        current_minus_di = _last(minus_di)
+        current_ema_20 = float(ema_20.to_numpy()[-1])
 
         # Stod/Motstand
         levels = self.identify_support_resistance(data)
@@ -267,7 +293,11 @@ class TechnicalAnalyzer:
         rsi_divergence = self.detect_divergence(data['Close'], rsi) if current_rsi else 'none'
 
         # Trend
-        trend = 'bullish' if current_price > float(ema_20.iloc[-1]) else 'bearish'
+        trend = 'bullish' if current_price > current_ema_20 else 'bearish'
+
+        # Volym - 20-dagars snitt beraknas en gang och ateranvands for ration
+        current_volume = data['Volume'].to_numpy()[-1]
+        volume_avg_20 = data['Volume'].tail(20).mean()
 
         # MACD Crossover
         macd_crossover = 'bullish' if current_macd and current_signal and current_macd > current_signal else 'bearish'
@@ -280,7 +310,7 @@ class TechnicalAnalyzer:
             'macd': {
                 'macd_line': current_macd,
                 'signal_line': current_signal,
-                'histogram': float(histogram.iloc[-1]) if not pd.isna(histogram.iloc[-1]) else None,
+                'histogram': _last(histogram),
                 'crossover': macd_crossover
             },
             'stochastic': {
@@ -295,13 +325,13 @@ class TechnicalAnalyzer:
                 'trend_strength': self._get_adx_status(current_adx)
             },
             'trend': trend,
-            'ema_20': float(ema_20.iloc[-1]),
-            'sma_50': float(sma_50.iloc[-1]),
+            'ema_20': current_ema_20,
+            'sma_50': float(sma_50.to_numpy()[-1]),
             'support': levels['support'],
             'resistance': levels['resistance'],
-            'volume': float(data['Volume'].iloc[-1]),
-            'volume_avg_20': float(data['Volume'].tail(20).mean()),  # 20-dagars genomsnitt
-            'volume_ratio': float(data['Volume'].iloc[-1] / data['Volume'].tail(20).mean())  # Current / Average
+            'volume': float(current_volume),
+            'volume_avg_20': float(volume_avg_20),  # 20-dagars genomsnitt
+            'volume_ratio': float(current_volume / volume_avg_20)  # Current / Average
         }
 
     @staticmethod
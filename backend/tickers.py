@@ -117,7 +117,7 @@ SWEDISH_TICKERS = {
 }
 
 # OMX30 Index - De 30 största aktierna (lista för quick add)
-OMX30_TICKERS = [
+OMX30_TICKERS = (
     "VOLVO-B",      # AB Volvo
     "ERIC-B",       # Ericsson
     "ABB",          # ABB Ltd
@@ -148,4 +148,4 @@ OMX30_TICKERS = [
     "EQT",          # EQT
     "HUS-B",        # Husqvarna B (fixed symbol)
     "SECU-B",       # Securitas
-]
+)